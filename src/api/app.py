@@ -1,28 +1,89 @@
+import time
+
+# Measured before the heavy imports below
+_import_started = time.perf_counter()
+
+import asyncio
+import io
 import json
+import os
 import uuid
+import zipfile
+from contextlib import asynccontextmanager
+from datetime import datetime
 from pathlib import Path
+from typing import List, Tuple
 
-import torch
-import torch.nn.functional as F
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-import pytesseract
-from pdf2image import convert_from_bytes
-
-from transformers import (
-    DistilBertTokenizerFast,
-    DistilBertForSequenceClassification
+from src.api.batching import MicroBatcher
+from src.api.result_cache import ResultCache, content_hash, fingerprint
+from src.classification.fast_path import FastPathClassifier, config_fingerprint
+from src.api.startup import StartupState, warmup_shapes, warmup_texts
+from src.ocr.ocr_invoices import DocumentTooLarge
+from src.ocr.text_normalizer import NORMALIZER_VERSION, normalize_text
+from src.api.workers import (
+    INFERENCE_WORKERS,
+    get_inference_pool,
+    run_ocr,
+    shutdown_pools
 )
-
-from src.routing.api import router as routing_router
+from src.routing.api import close_store, open_store, router as routing_router
+from src.routing.decision_log import DecisionLogWriter
+from src.routing.routing_rules import RULES_FILE, RoutingRules
+from src.routing.sqlite_repository import SqliteDecisionWriter
 
 # =========================
 # App Initialization (ONLY ONCE)
 # =========================
 
-app = FastAPI(title="Supplier Country Classification & Routing Engine")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Everything with a thread, file handle or pool is created here rather
+    than at import, and shut down in reverse order of its dependencies.
+    """
+    global model_loaded, routing_rules, fast_path, decision_log, batcher, text_cache, pdf_cache
+    startup.record("module_import", time.perf_counter() - _import_started)
+    model_loaded = asyncio.Event()
+
+    routing_rules = RoutingRules(RULES_FILE, LABEL_MAPPING_FILE, check_interval_s=ROUTING_RULES_CHECK_S)
+    fast_path = FastPathClassifier() if FAST_PATH_ENABLED else None
+
+    text_cache = ResultCache("text", max_entries=RESULT_CACHE_SIZE, disk_dir=RESULT_CACHE_DIR)
+    pdf_cache = ResultCache("pdf", max_entries=RESULT_CACHE_SIZE, disk_dir=RESULT_CACHE_DIR)
+
+    decision_feed = open_store()
+    decision_log = open_decision_log()
+    # Wake the live feed as soon as decisions are committed
+    decision_log.add_listener(decision_feed.notify)
+
+    batcher = MicroBatcher(
+        predict_batch,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=MAX_BATCH_WAIT_MS,
+        executor=get_inference_pool(),
+        max_concurrent_batches=INFERENCE_WORKERS
+    )
+
+    # Loaded in the background: the worker answers /healthz at once and
+    # /readyz once the model is usable
+    loader = asyncio.get_running_loop().create_task(load_model())
+    try:
+        yield
+    finally:
+        loader.cancel()
+        # In-flight batches finish before their executor goes away
+        await batcher.close()
+        shutdown_pools()
+        # Commits what is queued; the feed is notified before it closes
+        decision_log.close()
+        await close_store()
+
+
+app = FastAPI(title="Supplier Country Classification & Routing Engine", lifespan=lifespan)
 
 # =========================
 # CORS (CRITICAL – MUST BE BEFORE ROUTERS)
@@ -49,114 +110,452 @@ app.include_router(routing_router)
 # App & Paths
 # =========================
 
-MODEL_DIR = Path("models/country_classifier")
+# Fully fine-tuned model, or one exported by train_classifier_head
+MODEL_DIR = Path(os.getenv("MODEL_DIR", "models/country_classifier"))
 LABEL_MAPPING_FILE = Path("data/training/label_mapping.json")
 DECISION_LOG = Path("outputs/routing_decisions.jsonl")
-DECISION_LOG.parent.mkdir(parents=True, exist_ok=True)
+
+# "file" (JSONL log) or "sqlite"; must match src/routing/api.py
+DECISION_STORE = os.getenv("DECISION_STORE", "file")
+DECISIONS_DB_PATH = Path(os.getenv("DECISIONS_DB_PATH", "outputs/routing_decisions.db"))
+
+# Decision log group commit: max wait before a commit, and whether each
+# commit is fsync'd ("fsync") or only written to the OS ("write")
+DECISION_LOG_FLUSH_MS = float(os.getenv("DECISION_LOG_FLUSH_MS", "5"))
+DECISION_LOG_DURABILITY = os.getenv("DECISION_LOG_DURABILITY", "write")
+
+# Decision log segments: the active file is rotated and compressed once
+# it reaches either bound (0 disables that bound)
+DECISION_LOG_SEGMENT_MB = float(os.getenv("DECISION_LOG_SEGMENT_MB", "64"))
+DECISION_LOG_SEGMENT_HOURS = float(os.getenv("DECISION_LOG_SEGMENT_HOURS", "24"))
 
 MAX_LENGTH = 512
 
-# =========================
-# Routing Rules (Locked)
-# =========================
+# "fp32" or "int8" (int8 requires an approved quantization gate)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "fp32")
+
+# Micro-batching: concurrent requests share one forward pass
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "16"))
+MAX_BATCH_WAIT_MS = float(os.getenv("INFERENCE_MAX_BATCH_WAIT_MS", "10"))
 
-REGION_MAP = {
-    "India": "APAC", "China": "APAC", "Vietnam": "APAC", "Thailand": "APAC",
-    "Indonesia": "APAC", "Japan": "APAC", "South Korea": "APAC", "Australia": "APAC",
+# Bulk uploads: invoices in flight at once, and per-request file cap
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "32"))
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "5000"))
 
-    "Germany": "EMEA", "France": "EMEA", "United Kingdom": "EMEA", "Italy": "EMEA",
-    "Spain": "EMEA", "Netherlands": "EMEA", "Poland": "EMEA", "Czech Republic": "EMEA",
-    "Saudi Arabia": "EMEA", "United Arab Emirates": "EMEA",
+# Bulk uploads: uncompressed PDF bytes per request and per PDF. Zip
+# archives are checked against these from their directory, before any
+# member is decompressed.
+BULK_MAX_BYTES = int(float(os.getenv("BULK_MAX_MB", "1024")) * 1_000_000)
+BULK_MAX_FILE_BYTES = int(float(os.getenv("BULK_MAX_FILE_MB", "50")) * 1_000_000)
 
-    "United States": "AMER", "Canada": "AMER", "Mexico": "AMER", "Brazil": "AMER"
-}
+# Result cache: in-memory LRU bound, plus an optional on-disk tier
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "4096"))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR")
 
-TRANSPORT_MAP = {
-    "APAC": {"primary": "SEA", "secondary": "AIR"},
-    "EMEA": {"primary": "ROAD_RAIL", "secondary": "SEA"},
-    "AMER": {"primary": "ROAD", "secondary": "RAIL"}
-}
+# Skip the model when country signals in the text are decisive
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
 
 # =========================
-# Load Model (Once)
+# Routing Rules
 # =========================
 
-with open(LABEL_MAPPING_FILE, "r", encoding="utf-8") as f:
-    label_to_id = json.load(f)
+# Loaded from config/routing_rules.json; edits are picked up within
+# ROUTING_RULES_CHECK_S seconds, or at once via POST /routing-rules/reload
+ROUTING_RULES_CHECK_S = float(os.getenv("ROUTING_RULES_CHECK_S", "5"))
 
-id_to_label = {v: k for k, v in label_to_id.items()}
+# Created in the lifespan
+routing_rules: RoutingRules = None
 
-tokenizer = DistilBertTokenizerFast.from_pretrained(MODEL_DIR)
-model = DistilBertForSequenceClassification.from_pretrained(MODEL_DIR)
-model.eval()
+# =========================
+# Model (loaded in the lifespan)
+# =========================
+
+# Run representative batch shapes once before reporting ready, so the
+# first real requests do not pay for kernel selection and allocation
+WARMUP_ENABLED = os.getenv("MODEL_WARMUP", "1") == "1"
+
+startup = StartupState()
+startup.warmup_enabled = WARMUP_ENABLED
+# Set once loading finishes (or fails); created on the serving loop
+model_loaded: asyncio.Event = None
+
+label_to_id = None
+tokenizer = None
+model = None
+padding_stats = None
+predict = None
+
+fast_path: FastPathClassifier = None
+
+
+def _load_model_sync():
+    global label_to_id, tokenizer, model, padding_stats, predict
+
+    with startup.phase("import_torch"):
+        from src.classification.inference import PaddingStats, predict as predict_fn
+        from src.classification.quantization import load_classifier
+
+    with startup.phase("label_mapping"):
+        with open(LABEL_MAPPING_FILE, "r", encoding="utf-8") as f:
+            label_to_id = json.load(f)
+
+    with startup.phase("model_load"):
+        tokenizer, model = load_classifier(MODEL_DIR, INFERENCE_BACKEND)
+
+    update_cache_fingerprints()
+    padding_stats = PaddingStats()
+    predict = predict_fn
+
+
+def _warmup_sync():
+    with startup.phase("warmup"):
+        for batch_size, tokens in warmup_shapes(MAX_BATCH_SIZE):
+            predict(
+                warmup_texts(batch_size, tokens),
+                tokenizer,
+                model,
+                batch_size=batch_size,
+                max_length=MAX_LENGTH
+            )
+
+
+async def load_model():
+    """
+    Load the classifier, then optionally warm it up, on the inference
+    executor (the thread that will run it).
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        startup.status = "loading"
+        await loop.run_in_executor(get_inference_pool(), _load_model_sync)
+        startup.model_loaded = True
+        model_loaded.set()
+
+        if WARMUP_ENABLED:
+            startup.status = "warming_up"
+            await loop.run_in_executor(get_inference_pool(), _warmup_sync)
+            startup.warmed_up = True
+
+        startup.status = "ready"
+    except Exception as exc:
+        startup.fail(exc)
+        model_loaded.set()
+        print(f"Model loading failed: {startup.error}")
+
+
+async def wait_for_model():
+    """
+    Requests arriving during startup wait for the model (not the warmup).
+    """
+    await model_loaded.wait()
+    if not startup.model_loaded:
+        raise HTTPException(status_code=503, detail=f"Model unavailable: {startup.error}")
+
+
+def predict_batch(texts):
+    """
+    Classify one micro-batch of normalized texts with dynamic padding.
+    Returns a (pred_id, confidence) pair per text, in input order.
+    Runs on the inference executor, never on the event loop.
+    """
+    return predict(
+        texts,
+        tokenizer,
+        model,
+        batch_size=MAX_BATCH_SIZE,
+        max_length=MAX_LENGTH,
+        stats=padding_stats
+    )
+
+
+# PDF hash -> classification; normalized-text hash -> model prediction.
+# Routing is applied after the cache, so reloading the routing rules
+# never invalidates either. Created in the lifespan; fingerprints are
+# set when the model loads.
+text_cache: ResultCache = None
+pdf_cache: ResultCache = None
+
+
+def update_cache_fingerprints():
+    """
+    Namespace both caches by the weights, label mapping and settings of
+    the model just loaded, so results of a replaced model are never served.
+    """
+    artifacts = [MODEL_DIR, LABEL_MAPPING_FILE]
+    text_cache.ensure_fingerprint(fingerprint(artifacts, extra={"backend": INFERENCE_BACKEND}))
+    pdf_cache.ensure_fingerprint(fingerprint(
+        artifacts,
+        extra={
+            "backend": INFERENCE_BACKEND,
+            "fast_path": config_fingerprint() if FAST_PATH_ENABLED else None,
+            "normalizer": NORMALIZER_VERSION
+        }
+    ))
+
+# Created in the lifespan
+decision_log = None
+batcher: MicroBatcher = None
+
+
+def open_decision_log():
+    """
+    Group-commit writer for the configured decision store.
+    """
+    if DECISION_STORE == "sqlite":
+        return SqliteDecisionWriter(
+            DECISIONS_DB_PATH,
+            flush_interval_ms=DECISION_LOG_FLUSH_MS,
+            durability=DECISION_LOG_DURABILITY
+        )
+    return DecisionLogWriter(
+        DECISION_LOG,
+        flush_interval_ms=DECISION_LOG_FLUSH_MS,
+        durability=DECISION_LOG_DURABILITY,
+        segment_max_bytes=int(DECISION_LOG_SEGMENT_MB * 1_000_000) or None,
+        segment_max_age_s=DECISION_LOG_SEGMENT_HOURS * 3600 or None
+    )
 
 # =========================
 # Helpers
 # =========================
 
-def ocr_pdf_bytes(pdf_bytes: bytes) -> str:
-    images = convert_from_bytes(pdf_bytes, dpi=300)
-    text = []
-    for img in images:
-        text.append(pytesseract.image_to_string(img, lang="eng"))
-    return "\n".join(text).lower()
+def utc_now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+async def classify_invoice(pdf_bytes: bytes) -> dict:
+    """
+    OCR -> normalize -> classify for a single PDF, as
+    {"label_id", "confidence", "classifier"}. Byte-identical PDFs skip
+    the whole pipeline; PDFs whose OCR text matches an earlier one skip
+    inference.
+    """
+    pdf_key = content_hash(pdf_bytes)
+    cached = await pdf_cache.get_async(pdf_key)
+    if cached is not None:
+        return cached
+
+    raw_text = await run_ocr(pdf_bytes)
+    normalized_text = normalize_text(raw_text)
+
+    fast_result = fast_path.classify(normalized_text) if fast_path else None
+
+    if fast_result is not None:
+        country, confidence = fast_result
+        label_id = label_to_id[country]
+        classifier = "fast_path"
+    else:
+        text_key = content_hash(normalized_text)
+        prediction = await text_cache.get_async(text_key)
+        if prediction is None:
+            pred_id, confidence = await batcher.submit(normalized_text)
+            prediction = {"pred_id": pred_id, "confidence": confidence}
+            await text_cache.put_async(text_key, prediction)
+
+        label_id = prediction["pred_id"]
+        confidence = prediction["confidence"]
+        classifier = "model"
+
+    result = {
+        "label_id": label_id,
+        "confidence": round(confidence, 4),
+        "classifier": classifier
+    }
+    await pdf_cache.put_async(pdf_key, result)
+    return result
+
+
+async def process_invoice(invoice_id: str, pdf_bytes: bytes) -> dict:
+    """
+    Classify, then route with the current routing rules.
+    """
+    classification = await classify_invoice(pdf_bytes)
+
+    table = routing_rules.table()
+    route = table.route_id(classification["label_id"])
+
+    return {
+        "invoice_id": invoice_id,
+        "supplier_country": route.country,
+        "confidence": classification["confidence"],
+        "classifier": classification["classifier"],
+        "continent": route.region,
+        "primary_transport": route.primary_transport,
+        "secondary_transport": route.secondary_transport,
+        "routing_code": route.routing_code,
+        "rules_version": table.version,
+        "timestamp": utc_now()
+    }
+
+
+def too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=detail)
 
 
-def normalize_text(text: str) -> str:
-    return " ".join(text.split())
+def extract_pdfs(filename: str, content: bytes, max_files: int, max_bytes: int) -> List[Tuple[str, bytes]]:
+    """
+    (invoice_id, pdf_bytes) for an uploaded PDF or zip archive, within
+    `max_files` PDFs and `max_bytes` uncompressed bytes. An archive's
+    member count and sizes are checked from its directory before any
+    member is read; a member's invoice_id is its path in the archive.
+    """
+    if not zipfile.is_zipfile(io.BytesIO(content)):
+        if len(content) > BULK_MAX_FILE_BYTES:
+            raise too_large(f"{filename}: larger than {BULK_MAX_FILE_BYTES} bytes")
+        if len(content) > max_bytes or max_files < 1:
+            raise too_large(f"At most {BULK_MAX_FILES} PDFs and {BULK_MAX_BYTES} bytes per bulk request")
+        return [(filename, content)]
 
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        members = [
+            m for m in archive.infolist()
+            if not m.is_dir() and m.filename.lower().endswith(".pdf")
+        ]
 
-def route_country(country: str):
-    region = REGION_MAP.get(country, "UNKNOWN")
-    transport = TRANSPORT_MAP.get(region, {})
-    return region, transport.get("primary"), transport.get("secondary")
+        # file_size is what the directory declares; zipfile never
+        # decompresses a member past it
+        oversized = next((m for m in members if m.file_size > BULK_MAX_FILE_BYTES), None)
+        if oversized is not None:
+            raise too_large(f"{filename}: {oversized.filename} is larger than {BULK_MAX_FILE_BYTES} bytes")
+        if len(members) > max_files or sum(m.file_size for m in members) > max_bytes:
+            raise too_large(f"At most {BULK_MAX_FILES} PDFs and {BULK_MAX_BYTES} bytes per bulk request")
+
+        return [(member.filename, archive.read(member)) for member in members]
 
 
 # =========================
 # API Endpoint
 # =========================
 
+@app.get("/healthz")
+def healthz():
+    """
+    Liveness: the worker is up and serving, model loaded or not.
+    """
+    return {"status": "ok", "startup": startup.status}
+
+
+@app.get("/readyz")
+def readyz():
+    """
+    Readiness: 200 once the model is loaded and warmed up, 503 before
+    (or if loading failed). Includes the startup phase timings.
+    """
+    return JSONResponse(status_code=200 if startup.ready else 503, content=startup.as_dict())
+
+
 @app.post("/route-invoice")
 async def route_invoice(file: UploadFile = File(...)):
     invoice_id = file.filename or str(uuid.uuid4())
 
     pdf_bytes = await file.read()
-    raw_text = ocr_pdf_bytes(pdf_bytes)
-    normalized_text = normalize_text(raw_text)
+    await wait_for_model()
+    try:
+        decision = await process_invoice(invoice_id, pdf_bytes)
+    except DocumentTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+
+    # Group commit: wait until the decision is in the log before replying
+    await asyncio.wrap_future(decision_log.append(decision))
+
+    return JSONResponse(content=decision)
+
+
+@app.post("/route-invoices/bulk")
+async def route_invoices_bulk(files: List[UploadFile] = File(...)):
+    """
+    Route many PDFs (sent individually or as zip archives) concurrently.
+    Decisions are streamed back as NDJSON in completion order; a failed
+    invoice yields an error line instead of aborting the batch.
+    """
+    # Uploads are read up front: they are closed once the handler
+    # returns, before the response body is streamed.
+    invoices = []
+    total_bytes = 0
+    for upload in files:
+        content = await upload.read()
+        name = upload.filename or str(uuid.uuid4())
+        extracted = extract_pdfs(
+            name,
+            content,
+            max_files=BULK_MAX_FILES - len(invoices),
+            max_bytes=BULK_MAX_BYTES - total_bytes
+        )
+        invoices.extend(extracted)
+        total_bytes += sum(len(pdf_bytes) for _, pdf_bytes in extracted)
 
-    encoding = tokenizer(
-        normalized_text,
-        truncation=True,
-        padding="max_length",
-        max_length=MAX_LENGTH,
-        return_tensors="pt"
-    )
+    # invoice_id keys the decision log; the same id twice is ambiguous
+    seen = set()
+    for invoice_id, _ in invoices:
+        if invoice_id in seen:
+            raise HTTPException(status_code=400, detail=f"Duplicate invoice {invoice_id!r} in bulk request")
+        seen.add(invoice_id)
 
-    with torch.no_grad():
-        outputs = model(
-            input_ids=encoding["input_ids"],
-            attention_mask=encoding["attention_mask"]
-        )
+    await wait_for_model()
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
 
-    probs = F.softmax(outputs.logits, dim=-1)
-    confidence, pred_id = torch.max(probs, dim=-1)
+    async def run_one(invoice_id: str, pdf_bytes: bytes):
+        async with semaphore:
+            try:
+                return await process_invoice(invoice_id, pdf_bytes)
+            except Exception as exc:
+                return {"invoice_id": invoice_id, "error": str(exc)}
 
-    predicted_country = id_to_label[pred_id.item()]
-    conf_value = round(confidence.item(), 4)
+    async def stream_decisions():
+        tasks = [
+            asyncio.ensure_future(run_one(invoice_id, pdf_bytes))
+            for invoice_id, pdf_bytes in invoices
+        ]
 
-    region, primary, secondary = route_country(predicted_country)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
 
-    decision = {
-        "invoice_id": invoice_id,
-        "supplier_country": predicted_country,
-        "confidence": conf_value,
-        "continent": region,
-        "primary_transport": primary,
-        "secondary_transport": secondary,
-        "routing_code": f"{region}-{primary}"
+                # The log writer commits these in groups
+                if "error" not in result:
+                    decision_log.append(result)
+
+                yield json.dumps(result) + "\n"
+        finally:
+            # Client went away: stop outstanding work. Decisions already
+            # made are queued in the log writer and still get committed.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_decisions(), media_type="application/x-ndjson")
+
+
+@app.get("/inference/stats")
+def inference_stats():
+    return {"padding": padding_stats.as_dict() if padding_stats else None}
+
+
+@app.get("/decision-log/stats")
+def decision_log_stats():
+    return decision_log.metrics()
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "pdf": pdf_cache.stats(),
+        "text": text_cache.stats()
     }
 
-    with open(DECISION_LOG, "a", encoding="utf-8") as f:
-        f.write(json.dumps(decision) + "\n")
 
-    return JSONResponse(content=decision)
\ No newline at end of file
+@app.get("/routing-rules")
+def routing_rules_status():
+    return routing_rules.status()
+
+
+@app.post("/routing-rules/reload")
+def reload_routing_rules():
+    """
+    Reload config/routing_rules.json now. On an invalid file the current
+    rules stay in effect and the error is reported.
+    """
+    reloaded = routing_rules.reload()
+    status = routing_rules.status()
+    if not reloaded:
+        raise HTTPException(status_code=422, detail=status["last_error"])
+    return status
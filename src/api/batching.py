@@ -0,0 +1,180 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+# =========================
+# Micro-Batching Scheduler
+# =========================
+
+class MicroBatcher:
+    """
+    Gathers inference requests from concurrent callers into a single
+    batched forward pass.
+
+    A batch is dispatched as soon as it holds `max_batch_size` items or
+    `max_wait_ms` has elapsed since its first item arrived, whichever
+    comes first. Each caller receives only its own result.
+
+    `predict_batch` runs on `executor` so the event loop stays free while
+    the model is busy. At most `max_concurrent_batches` batches are in
+    flight; while all slots are taken, new requests keep accumulating
+    into the next batch.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[Sequence[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        executor: Optional[Executor] = None,
+        max_concurrent_batches: int = 1
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        if max_concurrent_batches < 1:
+            raise ValueError("max_concurrent_batches must be >= 1")
+
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.max_concurrent_batches = max_concurrent_batches
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight = set()
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Enqueue one item and wait for its result.
+        """
+        self._ensure_started()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def close(self):
+        """
+        Stop collecting, fail requests still queued and wait for the
+        batches already dispatched to finish.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, fut = self._queue.get_nowait()
+                if not fut.done():
+                    fut.set_exception(RuntimeError("MicroBatcher is closed"))
+
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        self._worker = None
+        self._queue = None
+        self._slots = None
+
+    # -------------------------
+    # Internals
+    # -------------------------
+
+    def _ensure_started(self):
+        # The queue and worker must be bound to the running event loop,
+        # so they are created on first use rather than at import time.
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        try:
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Closing: hand the items back so close() fails them
+            for entry in batch:
+                self._queue.put_nowait(entry)
+            raise
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        slots = self._slots
+
+        while True:
+            # Wait for a free slot before collecting, so a busy model
+            # translates into larger batches rather than a longer queue.
+            await slots.acquire()
+
+            try:
+                batch = await self._collect()
+            except BaseException:
+                slots.release()
+                raise
+
+            # Callers that gave up (e.g. client disconnected) are dropped
+            batch = [(item, fut) for item, fut in batch if not fut.cancelled()]
+            if not batch:
+                slots.release()
+                continue
+
+            task = loop.create_task(self._dispatch(batch, slots))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(
+        self,
+        batch: List[Tuple[Any, asyncio.Future]],
+        slots: asyncio.Semaphore
+    ):
+        loop = asyncio.get_running_loop()
+        items = [item for item, _ in batch]
+
+        try:
+            results = await loop.run_in_executor(
+                self.executor, self.predict_batch, items
+            )
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        finally:
+            slots.release()
+
+        # zip would leave the callers past the shortest side waiting forever
+        if len(results) != len(batch):
+            exc = RuntimeError(
+                f"predict_batch returned {len(results)} results for {len(batch)} items"
+            )
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+# =========================
+# Keys & Fingerprints
+# =========================
+
+def content_hash(data) -> str:
+    """
+    SHA-256 hex digest of bytes or text.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint(paths: Iterable[Path], extra: Any = None) -> str:
+    """
+    Cheap version stamp for on-disk artifacts (model weights, label
+    mapping, ...) plus any JSON-serializable config such as routing
+    tables. Uses file names, sizes and mtimes, so replacing any file
+    yields a new fingerprint without reading large weight files.
+    """
+    h = hashlib.sha256()
+
+    for path in sorted(Path(p) for p in paths):
+        files = sorted(path.rglob("*")) if path.is_dir() else [path]
+        for file in files:
+            if not file.is_file():
+                continue
+            st = file.stat()
+            h.update(f"{file.as_posix()}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+
+    if extra is not None:
+        h.update(json.dumps(extra, sort_keys=True).encode("utf-8"))
+
+    return h.hexdigest()[:16]
+
+# =========================
+# Result Cache
+# =========================
+
+class ResultCache:
+    """
+    Two-tier cache: a size-bounded in-memory LRU, optionally backed by a
+    directory of JSON files that survives restarts.
+
+    Entries are namespaced by a fingerprint of whatever produced them.
+    When the fingerprint changes the memory tier is dropped and the disk
+    tier switches to a fresh namespace, so stale results are never served;
+    the other namespaces of this cache are deleted from disk.
+
+    `get_async`/`put_async` run the disk tier on a worker thread, so a
+    slow disk never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 4096,
+        disk_dir: Optional[Path] = None,
+        fingerprint: str = ""
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.fingerprint = fingerprint
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def ensure_fingerprint(self, fingerprint: str):
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                self.fingerprint = fingerprint
+                self._entries.clear()
+        self._prune_disk()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        return self._record_disk(key, self._read_disk(key))
+
+    def put(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        if self.disk_dir is None:
+            return self._record_disk(key, None)
+        loop = asyncio.get_running_loop()
+        return self._record_disk(key, await loop.run_in_executor(None, self._read_disk, key))
+
+    async def put_async(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._remember(key, value)
+        if self.disk_dir is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_disk, key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "fingerprint": self.fingerprint,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+    # -------------------------
+    # Internals
+    # -------------------------
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def _record_disk(self, key: str, value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        if self.disk_dir is None:
+            return None
+        return self.disk_dir / self.name / self.fingerprint / key[:2] / f"{key}.json"
+
+    def _prune_disk(self):
+        """
+        Delete this cache's namespaces other than the current one.
+        """
+        if self.disk_dir is None:
+            return
+        root = self.disk_dir / self.name
+        if not root.is_dir():
+            return
+        for namespace in root.iterdir():
+            if namespace.is_dir() and namespace.name != self.fingerprint:
+                shutil.rmtree(namespace, ignore_errors=True)
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: Dict[str, Any]):
+        path = self._disk_path(key)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write-then-rename so readers never see a partial entry
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,76 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# =========================
+# Startup Phases
+# =========================
+
+class StartupState:
+    """
+    Readiness of one API worker and how long each startup phase took.
+
+    The worker is live as soon as it serves requests; it is ready once
+    the model is loaded and, when enabled, warmed up.
+    """
+
+    def __init__(self):
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.model_loaded = False
+        self.warmed_up = False
+        self.warmup_enabled = True
+        self._phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        self._phases.append((name, seconds))
+        print(f"Startup phase {name}: {seconds:.2f}s")
+
+    def fail(self, exc: BaseException):
+        self.status = "failed"
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def ready(self) -> bool:
+        return self.model_loaded and (self.warmed_up or not self.warmup_enabled)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "model_loaded": self.model_loaded,
+            "warmed_up": self.warmed_up,
+            "error": self.error,
+            "phases_s": {name: round(seconds, 3) for name, seconds in self._phases},
+        }
+
+# =========================
+# Warmup
+# =========================
+
+# Token lengths covering short invoices up to the 512-token cap
+WARMUP_LENGTHS = (64, 256, 512)
+
+
+def warmup_texts(batch_size: int, tokens: int) -> List[str]:
+    """
+    Invoice-like texts of roughly `tokens` tokens each, so a warmup pass
+    runs the same tensor shapes as real batches.
+    """
+    line = "invoice number inv-0001 supplier trading company limited total amount due "
+    words = line.split()
+    text = " ".join(words[i % len(words)] for i in range(tokens))
+    return [text] * batch_size
+
+
+def warmup_shapes(max_batch_size: int) -> List[Tuple[int, int]]:
+    sizes = sorted({1, max_batch_size})
+    return [(size, tokens) for size in sizes for tokens in WARMUP_LENGTHS]
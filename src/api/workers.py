@@ -0,0 +1,73 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from src.ocr.ocr_invoices import ocr_pdf_bytes, set_page_workers
+
+# =========================
+# Configuration
+# =========================
+
+# OCR is CPU-bound (rasterization + Tesseract), so it gets a process pool
+# sized to the machine by default.
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+
+# Tesseract processes per OCR worker. By default the cores are split
+# across workers so pages of a single large PDF still use the machine.
+OCR_PAGE_WORKERS = int(os.getenv(
+    "OCR_PAGE_WORKERS",
+    str(max(1, (os.cpu_count() or 1) // max(1, OCR_WORKERS)))
+))
+
+# Each inference worker runs one batched forward pass at a time; torch
+# already parallelizes inside a pass, so one worker is usually enough.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+
+# =========================
+# Worker Pools
+# =========================
+
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_inference_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    global _ocr_pool
+    if _ocr_pool is None:
+        _ocr_pool = ProcessPoolExecutor(
+            max_workers=OCR_WORKERS,
+            initializer=set_page_workers,
+            initargs=(OCR_PAGE_WORKERS,)
+        )
+    return _ocr_pool
+
+
+def get_inference_pool() -> ThreadPoolExecutor:
+    global _inference_pool
+    if _inference_pool is None:
+        _inference_pool = ThreadPoolExecutor(
+            max_workers=INFERENCE_WORKERS,
+            thread_name_prefix="inference"
+        )
+    return _inference_pool
+
+
+async def run_ocr(pdf_bytes: bytes) -> str:
+    """
+    OCR a PDF in the process pool without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_ocr_pool(), ocr_pdf_bytes, pdf_bytes)
+
+
+def shutdown_pools():
+    global _ocr_pool, _inference_pool
+
+    if _ocr_pool is not None:
+        _ocr_pool.shutdown(wait=False, cancel_futures=True)
+        _ocr_pool = None
+
+    if _inference_pool is not None:
+        _inference_pool.shutdown(wait=False, cancel_futures=True)
+        _inference_pool = None
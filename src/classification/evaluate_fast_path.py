@@ -0,0 +1,75 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from transformers import (
+    DistilBertTokenizerFast,
+    DistilBertForSequenceClassification
+)
+
+from src.classification.fast_path import FastPathClassifier
+from src.classification.inference import predict
+
+# =========================
+# Configuration
+# =========================
+
+MODEL_DIR = Path(os.getenv("MODEL_DIR", "models/country_classifier"))
+VAL_FILE = Path("data/training/val.jsonl")
+LABEL_MAPPING_FILE = Path("data/training/label_mapping.json")
+
+MAX_LENGTH = 512
+
+# =========================
+# Evaluation
+# =========================
+
+def main():
+    with open(LABEL_MAPPING_FILE, "r", encoding="utf-8") as f:
+        label_to_id = json.load(f)
+
+    id_to_label = {v: k for k, v in label_to_id.items()}
+
+    with open(VAL_FILE, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    texts = [r["text"] for r in records]
+    labels = [id_to_label[r["label"]] for r in records]
+
+    # Fast path
+    fast_path = FastPathClassifier()
+    start = time.perf_counter()
+    fast_results = [fast_path.classify(text) for text in texts]
+    fast_seconds = time.perf_counter() - start
+
+    # Model, one invoice per forward pass as in the request path
+    tokenizer = DistilBertTokenizerFast.from_pretrained(MODEL_DIR)
+    model = DistilBertForSequenceClassification.from_pretrained(MODEL_DIR)
+    model.eval()
+
+    start = time.perf_counter()
+    model_results = predict(texts, tokenizer, model, batch_size=1, max_length=MAX_LENGTH)
+    model_seconds = time.perf_counter() - start
+
+    taken = [i for i, r in enumerate(fast_results) if r is not None]
+    fast_correct = sum(fast_results[i][0] == labels[i] for i in taken)
+    model_correct_taken = sum(id_to_label[model_results[i][0]] == labels[i] for i in taken)
+    model_correct = sum(id_to_label[p] == label for (p, _), label in zip(model_results, labels))
+
+    n = len(texts)
+    fast_ms = fast_seconds / n * 1000
+    model_ms = model_seconds / n * 1000
+    saved_ms = (len(taken) * model_ms - n * fast_ms) / n
+
+    print(f"Fast path taken: {len(taken)}/{n} ({len(taken) / n:.1%})")
+    if taken:
+        print(f"Fast path accuracy: {fast_correct}/{len(taken)} ({fast_correct / len(taken):.1%})")
+        print(f"Model accuracy on the same invoices: {model_correct_taken}/{len(taken)}")
+    print(f"Model accuracy on all invoices: {model_correct}/{n} ({model_correct / n:.1%})")
+    print(f"Latency per invoice: fast path {fast_ms:.3f} ms, model {model_ms:.1f} ms")
+    print(f"Average inference latency saved per invoice: {saved_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
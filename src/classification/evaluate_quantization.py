@@ -0,0 +1,79 @@
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.classification.inference import predict
+from src.classification.quantization import (
+    MIN_AGREEMENT,
+    load_classifier,
+    weights_fingerprint,
+    write_gate
+)
+
+# =========================
+# Configuration
+# =========================
+
+MODEL_DIR = Path(os.getenv("MODEL_DIR", "models/country_classifier"))
+VAL_FILE = Path("data/training/val.jsonl")
+
+MAX_LENGTH = 512
+BATCH_SIZE = 16
+
+# =========================
+# Evaluation
+# =========================
+
+def main():
+    with open(VAL_FILE, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    texts = [r["text"] for r in records]
+    labels = [r["label"] for r in records]
+
+    timings = {}
+    results = {}
+    for backend in ("fp32", "int8"):
+        tokenizer, model = load_classifier(MODEL_DIR, backend, enforce_gate=False)
+
+        start = time.perf_counter()
+        results[backend] = predict(
+            texts, tokenizer, model, batch_size=BATCH_SIZE, max_length=MAX_LENGTH
+        )
+        timings[backend] = time.perf_counter() - start
+
+    fp32, int8 = results["fp32"], results["int8"]
+    n = len(texts)
+
+    agreement = sum(a[0] == b[0] for a, b in zip(fp32, int8)) / n
+    max_delta = max(abs(a[1] - b[1]) for a, b in zip(fp32, int8))
+    mean_delta = sum(abs(a[1] - b[1]) for a, b in zip(fp32, int8)) / n
+
+    report = {
+        "model_fingerprint": weights_fingerprint(MODEL_DIR),
+        "evaluated_at": datetime.utcnow().isoformat() + "Z",
+        "records": n,
+        "agreement": round(agreement, 4),
+        "min_agreement": MIN_AGREEMENT,
+        "approved": agreement >= MIN_AGREEMENT,
+        "max_confidence_delta": round(max_delta, 6),
+        "mean_confidence_delta": round(mean_delta, 6),
+        "fp32_accuracy": round(sum(p == l for (p, _), l in zip(fp32, labels)) / n, 4),
+        "int8_accuracy": round(sum(p == l for (p, _), l in zip(int8, labels)) / n, 4),
+        "fp32_seconds": round(timings["fp32"], 3),
+        "int8_seconds": round(timings["int8"], 3)
+    }
+
+    write_gate(MODEL_DIR, report)
+
+    print(json.dumps(report, indent=2))
+    if report["approved"]:
+        print("int8 backend APPROVED; enable with INFERENCE_BACKEND=int8")
+    else:
+        print(f"int8 backend REJECTED: agreement below {MIN_AGREEMENT}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from src.data_generation.generate_invoices import COUNTRIES
+
+# =========================
+# Configuration
+# =========================
+
+# Evidence weight per signal kind. A signal shared by several countries
+# (e.g. "$" or "+1") splits its weight evenly between them.
+SIGNAL_WEIGHTS = {
+    "legal_footer": 3.0,
+    "tax_type": 2.0,
+    "phone_prefix": 2.0,
+    "currency_code": 1.0,
+    "currency_symbol": 1.0
+}
+
+# Decisive = enough evidence for the top country, and a clear lead over
+# the runner-up (roughly one strong signal's worth)
+MIN_SCORE = 4.0
+MIN_MARGIN = 3.0
+
+# =========================
+# Signal Patterns
+# =========================
+
+# Context each kind of signal must appear in. "{}" is replaced by a group
+# capturing the alternation of that kind's literals, so every kind is one
+# branch of the compiled matcher.
+KIND_PATTERNS = {
+    # Printed as "Tax ID (GSTIN): ..."
+    "tax_type": r"\(\s*{}\s*\)",
+    # "+1" must not match the start of "+10..." / "+12..."
+    "phone_prefix": r"{}(?!\d)",
+    # A symbol followed by an amount, not embedded in a word
+    "currency_symbol": r"(?<![^\s:(]){}\s*(?=\d)",
+    "currency_code": r"(?<![a-z]){}(?![a-z])",
+    "legal_footer": r"{}"
+}
+
+
+def _canonical(value: str) -> str:
+    return " ".join(value.lower().split())
+
+
+def _literal_pattern(value: str) -> str:
+    # Whitespace-insensitive, since OCR and normalization may reflow it
+    return r"\s+".join(re.escape(word) for word in value.split())
+
+
+def config_fingerprint(
+    countries: Dict[str, Dict[str, str]] = COUNTRIES,
+    min_score: float = MIN_SCORE,
+    min_margin: float = MIN_MARGIN
+) -> str:
+    """
+    Stamp of everything that decides the fast path's answers: the signal
+    table, weights, patterns and thresholds.
+    """
+    config = {
+        "signals": {c: {k: info.get(k) for k in KIND_PATTERNS} for c, info in countries.items()},
+        "weights": SIGNAL_WEIGHTS,
+        "patterns": KIND_PATTERNS,
+        "min_score": min_score,
+        "min_margin": min_margin
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+# =========================
+# Classifier
+# =========================
+
+class FastPathClassifier:
+    """
+    Deterministic country classifier over the per-country signals listed
+    in generate_invoices.COUNTRIES.
+
+    All signals are compiled into one alternation and scored in a single
+    pass over the text. `classify` only answers when the evidence is
+    unambiguous; otherwise it returns None and the caller falls back to
+    the model.
+    """
+
+    def __init__(
+        self,
+        countries: Dict[str, Dict[str, str]] = COUNTRIES,
+        min_score: float = MIN_SCORE,
+        min_margin: float = MIN_MARGIN
+    ):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.fingerprint = config_fingerprint(countries, min_score, min_margin)
+
+        # kind -> canonical value -> countries sharing that exact signal
+        owners: Dict[str, Dict[str, List[str]]] = {
+            kind: defaultdict(list) for kind in KIND_PATTERNS
+        }
+        for country, info in countries.items():
+            for kind in KIND_PATTERNS:
+                value = info.get(kind)
+                if value:
+                    owners[kind][_canonical(value)].append(country)
+
+        # One capturing group per kind (not per literal: every extra group
+        # slows each match attempt); the matched text identifies the signal.
+        self._signals: Dict[Tuple[str, str], List[str]] = {}
+        branches = []
+        for kind, literals in owners.items():
+            for value, shared_by in literals.items():
+                self._signals[(kind, _canonical(value))] = shared_by
+
+            # Longer literals first, so at any position "r$" wins over "$"
+            # and "vat registration number" over "vat".
+            alternatives = [_literal_pattern(v) for v in sorted(literals, key=len, reverse=True)]
+            group = f"(?P<{kind}>{'|'.join(alternatives)})"
+            branches.append(KIND_PATTERNS[kind].format(group))
+
+        self._matcher = re.compile("|".join(branches))
+
+    def score(self, text: str) -> Dict[str, float]:
+        """
+        Evidence score per country. Each distinct signal counts once.
+        """
+        seen = {
+            (m.lastgroup, _canonical(m.group(m.lastgroup)))
+            for m in self._matcher.finditer(text.lower())
+        }
+
+        scores: Dict[str, float] = defaultdict(float)
+        for kind, value in seen:
+            shared_by = self._signals[(kind, value)]
+            weight = SIGNAL_WEIGHTS[kind] / len(shared_by)
+            for country in shared_by:
+                scores[country] += weight
+
+        return dict(scores)
+
+    def classify(self, text: str) -> Optional[Tuple[str, float]]:
+        """
+        Returns (country, share of evidence) when decisive, else None.
+        """
+        scores = self.score(text)
+        if not scores:
+            return None
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        country, top = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+
+        if top < self.min_score or top - runner_up < self.min_margin:
+            return None
+
+        return country, top / sum(scores.values())
@@ -0,0 +1,215 @@
+import threading
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import torch
+import torch.nn.functional as F
+
+# =========================
+# Configuration
+# =========================
+
+MAX_LENGTH = 512
+BATCH_SIZE = 16
+
+# =========================
+# Padding Statistics
+# =========================
+
+class PaddingStats:
+    """
+    Token accounting for dynamic padding, compared with padding every
+    sequence to `max_length`. Safe to update from several threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sequences = 0
+        self.real_tokens = 0
+        self.padded_tokens = 0
+        self.static_tokens = 0
+
+    def update(self, lengths: Sequence[int], batch_width: int, max_length: int):
+        with self._lock:
+            self.sequences += len(lengths)
+            self.real_tokens += sum(lengths)
+            self.padded_tokens += len(lengths) * batch_width
+            self.static_tokens += len(lengths) * max_length
+
+    @property
+    def pad_tokens_removed_share(self) -> float:
+        """
+        Fraction of the pad tokens that fixed max_length padding would
+        have produced which were never fed to the model.
+        """
+        static_pad = self.static_tokens - self.real_tokens
+        if static_pad <= 0:
+            return 0.0
+        return (self.static_tokens - self.padded_tokens) / static_pad
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "sequences": self.sequences,
+                "real_tokens": self.real_tokens,
+                "padded_tokens": self.padded_tokens,
+                "static_tokens": self.static_tokens,
+                "pad_tokens_removed_share": round(self.pad_tokens_removed_share, 4)
+            }
+
+    def summary(self) -> str:
+        return (
+            f"Dynamic padding: {self.padded_tokens} tokens fed vs "
+            f"{self.static_tokens} at max_length "
+            f"({self.pad_tokens_removed_share:.1%} of pad tokens removed)"
+        )
+
+# =========================
+# Inference
+# =========================
+
+def encode(texts: Sequence[str], tokenizer, max_length: int = MAX_LENGTH):
+    """
+    Tokenize texts without padding. Separate from inference so callers
+    can tokenize ahead of the model (e.g. in a background thread).
+    """
+    return tokenizer(list(texts), truncation=True, max_length=max_length)
+
+
+def iter_encoded_batches(
+    encodings,
+    tokenizer,
+    batch_size: int = BATCH_SIZE,
+    max_length: int = MAX_LENGTH,
+    stats: Optional[PaddingStats] = None
+) -> Iterator[Tuple[List[int], dict]]:
+    """
+    Yield (indices, padded batch) covering every encoded text once,
+    grouped by token length and padded only to the longest sequence of
+    each batch. Pad positions are masked out, so model outputs match
+    max_length padding.
+    """
+    lengths = [len(ids) for ids in encodings["input_ids"]]
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+
+        batch = tokenizer.pad(
+            {
+                "input_ids": [encodings["input_ids"][i] for i in indices],
+                "attention_mask": [encodings["attention_mask"][i] for i in indices]
+            },
+            padding="longest",
+            return_tensors="pt"
+        )
+
+        if stats is not None:
+            stats.update(
+                [lengths[i] for i in indices],
+                batch["input_ids"].shape[1],
+                max_length
+            )
+
+        yield indices, batch
+
+
+def iter_batches(
+    texts: Sequence[str],
+    tokenizer,
+    batch_size: int = BATCH_SIZE,
+    max_length: int = MAX_LENGTH,
+    stats: Optional[PaddingStats] = None
+) -> Iterator[Tuple[List[int], dict]]:
+    """
+    Yield (indices, padded batch) covering every text once.
+    Texts are tokenized once, then batched as in iter_encoded_batches.
+    """
+    encodings = encode(texts, tokenizer, max_length)
+    return iter_encoded_batches(encodings, tokenizer, batch_size, max_length, stats)
+
+
+def predict_encoded(
+    encodings,
+    tokenizer,
+    model,
+    batch_size: int = BATCH_SIZE,
+    max_length: int = MAX_LENGTH,
+    stats: Optional[PaddingStats] = None
+) -> List[Tuple[int, float]]:
+    """
+    Classify texts already tokenized by `encode`; one (pred_id,
+    confidence) pair per text, in input order.
+    """
+    count = len(encodings["input_ids"])
+    if not count:
+        return []
+
+    results: List[Optional[Tuple[int, float]]] = [None] * count
+
+    for indices, batch in iter_encoded_batches(encodings, tokenizer, batch_size, max_length, stats):
+        with torch.no_grad():
+            outputs = model(
+                input_ids=batch["input_ids"],
+                attention_mask=batch["attention_mask"]
+            )
+
+        probs = F.softmax(outputs.logits, dim=-1)
+        confidence, pred_id = torch.max(probs, dim=-1)
+
+        for i, p, c in zip(indices, pred_id.tolist(), confidence.tolist()):
+            results[i] = (p, c)
+
+    return results
+
+
+def predict(
+    texts: Sequence[str],
+    tokenizer,
+    model,
+    batch_size: int = BATCH_SIZE,
+    max_length: int = MAX_LENGTH,
+    stats: Optional[PaddingStats] = None
+) -> List[Tuple[int, float]]:
+    """
+    Classify texts and return a (pred_id, confidence) pair per text, in
+    input order. Batches are dynamically padded (see iter_batches).
+    """
+    if not texts:
+        return []
+
+    encodings = encode(texts, tokenizer, max_length)
+    return predict_encoded(encodings, tokenizer, model, batch_size, max_length, stats)
+
+
+def predict_static(
+    texts: Sequence[str],
+    tokenizer,
+    model,
+    max_length: int = MAX_LENGTH
+) -> List[Tuple[int, float]]:
+    """
+    Reference path: one text per forward pass, padded to max_length.
+    Used to check that `predict` gives the same answers.
+    """
+    results = []
+
+    for text in texts:
+        encoding = tokenizer(
+            text,
+            truncation=True,
+            padding="max_length",
+            max_length=max_length,
+            return_tensors="pt"
+        )
+
+        with torch.no_grad():
+            outputs = model(
+                input_ids=encoding["input_ids"],
+                attention_mask=encoding["attention_mask"]
+            )
+
+        probs = F.softmax(outputs.logits, dim=-1)
+        confidence, pred_id = torch.max(probs, dim=-1)
+        results.append((pred_id.item(), confidence.item()))
+
+    return results
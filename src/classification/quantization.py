@@ -0,0 +1,111 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import torch
+
+from transformers import (
+    DistilBertTokenizerFast,
+    DistilBertForSequenceClassification
+)
+
+# =========================
+# Configuration
+# =========================
+
+BACKENDS = ("fp32", "int8")
+
+# Written next to the model by evaluate_quantization.py
+GATE_FILE_NAME = "quantization_gate.json"
+
+# Minimum share of validation invoices where int8 and fp32 must agree
+MIN_AGREEMENT = 0.99
+
+# =========================
+# Gate
+# =========================
+
+def weights_fingerprint(model_dir: Path) -> str:
+    """
+    Content hash of the model weights and config, so an approval only
+    applies to the exact model it was measured on.
+    """
+    h = hashlib.sha256()
+    for name in ("config.json", "model.safetensors", "pytorch_model.bin"):
+        path = Path(model_dir) / name
+        if not path.exists():
+            continue
+        h.update(name.encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def read_gate(model_dir: Path) -> Optional[Dict[str, Any]]:
+    path = Path(model_dir) / GATE_FILE_NAME
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_gate(model_dir: Path, report: Dict[str, Any]):
+    with open(Path(model_dir) / GATE_FILE_NAME, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def check_gate(model_dir: Path):
+    """
+    Raise unless the int8 backend was approved for this exact model.
+    """
+    gate = read_gate(model_dir)
+    if gate is None:
+        raise RuntimeError(
+            f"int8 backend not evaluated for {model_dir}; "
+            f"run python -m src.classification.evaluate_quantization"
+        )
+    if gate["model_fingerprint"] != weights_fingerprint(model_dir):
+        raise RuntimeError(
+            f"int8 gate in {model_dir} was measured on different weights; "
+            f"re-run python -m src.classification.evaluate_quantization"
+        )
+    if not gate["approved"]:
+        raise RuntimeError(
+            f"int8 backend rejected for {model_dir}: agreement "
+            f"{gate['agreement']:.4f} < required {gate['min_agreement']:.4f}"
+        )
+
+# =========================
+# Loading
+# =========================
+
+def quantize(model):
+    """
+    Dynamic int8 quantization of the linear layers (weights stored as
+    int8, activations quantized on the fly). CPU only.
+    """
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def load_classifier(model_dir: Path, backend: str = "fp32", enforce_gate: bool = True):
+    """
+    Load tokenizer and model for the requested backend, in eval mode.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {BACKENDS}")
+
+    if backend == "int8" and enforce_gate:
+        check_gate(model_dir)
+
+    tokenizer = DistilBertTokenizerFast.from_pretrained(model_dir)
+    model = DistilBertForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    if backend == "int8":
+        model = quantize(model)
+
+    return tokenizer, model
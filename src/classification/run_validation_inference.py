@@ -1,28 +1,36 @@
+import argparse
 import json
+import os
 from pathlib import Path
-import torch
-import torch.nn.functional as F
 
 from transformers import (
     DistilBertTokenizerFast,
     DistilBertForSequenceClassification
 )
 
+from src.classification.inference import PaddingStats, predict, predict_static
+
 # =========================
 # Configuration
 # =========================
 
-MODEL_DIR = Path("models/country_classifier")
+MODEL_DIR = Path(os.getenv("MODEL_DIR", "models/country_classifier"))
 VAL_FILE = Path("data/training/val.jsonl")
 LABEL_MAPPING_FILE = Path("data/training/label_mapping.json")
 
 MAX_LENGTH = 512
+BATCH_SIZE = 16
 
 # =========================
 # Inference
 # =========================
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the classifier over the validation set.")
+    parser.add_argument("--check-parity", action="store_true",
+                        help="also run the max_length padding path and compare predictions (doubles the cost)")
+    args = parser.parse_args()
+
     # Load label mapping
     with open(LABEL_MAPPING_FILE, "r", encoding="utf-8") as f:
         label_to_id = json.load(f)
@@ -34,37 +42,26 @@ def main():
     model = DistilBertForSequenceClassification.from_pretrained(MODEL_DIR)
     model.eval()
 
-    results = []
-
     with open(VAL_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            record = json.loads(line)
-
-            encoding = tokenizer(
-                record["text"],
-                truncation=True,
-                padding="max_length",
-                max_length=MAX_LENGTH,
-                return_tensors="pt"
-            )
-
-            with torch.no_grad():
-                outputs = model(
-                    input_ids=encoding["input_ids"],
-                    attention_mask=encoding["attention_mask"]
-                )
-
-            logits = outputs.logits
-            probs = F.softmax(logits, dim=-1)
-
-            confidence, pred_id = torch.max(probs, dim=-1)
-
-            result = {
-                "predicted_country": id_to_label[pred_id.item()],
-                "confidence": round(confidence.item(), 4)
-            }
-
-            results.append(result)
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+
+    padding_stats = PaddingStats()
+    predictions = predict(
+        texts,
+        tokenizer,
+        model,
+        batch_size=BATCH_SIZE,
+        max_length=MAX_LENGTH,
+        stats=padding_stats
+    )
+
+    results = [
+        {
+            "predicted_country": id_to_label[pred_id],
+            "confidence": round(confidence, 4)
+        }
+        for pred_id, confidence in predictions
+    ]
 
     # Print a small sample
     print("Sample predictions (validation):")
@@ -73,6 +70,16 @@ def main():
 
     avg_conf = sum(r["confidence"] for r in results) / len(results)
     print(f"\nAverage confidence on validation set: {avg_conf:.4f}")
+    print(padding_stats.summary())
+
+    if args.check_parity:
+        reference = predict_static(texts, tokenizer, model, max_length=MAX_LENGTH)
+        agree = sum(p[0] == r[0] for p, r in zip(predictions, reference))
+        max_delta = max(abs(p[1] - r[1]) for p, r in zip(predictions, reference))
+        print(
+            f"Parity vs max_length padding: {agree}/{len(texts)} predictions match, "
+            f"max confidence delta {max_delta:.2e}"
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,266 @@
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from transformers import (
+    DistilBertModel,
+    DistilBertTokenizerFast,
+    DistilBertForSequenceClassification,
+    set_seed
+)
+
+from src.classification.inference import iter_batches
+from src.classification.quantization import weights_fingerprint
+
+# =========================
+# Configuration
+# =========================
+
+RANDOM_SEED = 42
+MAX_LENGTH = 512
+EMBED_BATCH_SIZE = 16
+
+HEAD_EPOCHS = 300
+HEAD_BATCH_SIZE = 64
+HEAD_LEARNING_RATE = 1e-3
+HEAD_WEIGHT_DECAY = 0.01
+
+TRAIN_FILE = Path("data/training/train.jsonl")
+VAL_FILE = Path("data/training/val.jsonl")
+LABEL_MAPPING_FILE = Path("data/training/label_mapping.json")
+
+# The fully fine-tuned model's encoder, or the base checkpoint
+ENCODER = "models/country_classifier"
+FALLBACK_ENCODER = "distilbert-base-uncased"
+
+EMBEDDING_DIR = Path("data/training/embeddings")
+OUTPUT_DIR = Path("models/country_classifier_head")
+
+# =========================
+# Embedding Cache
+# =========================
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def encoder_fingerprint(encoder: str) -> str:
+    if Path(encoder).is_dir():
+        return weights_fingerprint(Path(encoder))
+    return encoder
+
+
+def load_records(jsonl_file: Path):
+    with open(jsonl_file, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def embed_split(jsonl_file: Path, tokenizer, encoder, encoder_id: str):
+    """
+    Pooled ([CLS]) embeddings of one split from the frozen encoder, as a
+    read-only memory-mapped array, plus labels. Computed once per
+    (encoder weights, data file, max_length) and reused afterwards.
+    """
+    EMBEDDING_DIR.mkdir(parents=True, exist_ok=True)
+    split = jsonl_file.stem
+    array_path = EMBEDDING_DIR / f"{split}.npy"
+    labels_path = EMBEDDING_DIR / f"{split}.labels.npy"
+    meta_path = EMBEDDING_DIR / f"{split}.json"
+
+    fingerprint = {
+        "encoder": encoder_id,
+        "data": file_sha256(jsonl_file),
+        "max_length": MAX_LENGTH,
+    }
+
+    if meta_path.exists() and array_path.exists():
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f)["fingerprint"] == fingerprint:
+                return np.load(array_path, mmap_mode="r"), np.load(labels_path)
+
+    records = load_records(jsonl_file)
+    texts = [r["text"] for r in records]
+    labels = np.array([r["label"] for r in records], dtype=np.int64)
+    dim = encoder.config.dim
+
+    start = time.perf_counter()
+    embeddings = np.lib.format.open_memmap(
+        array_path, mode="w+", dtype=np.float32, shape=(len(texts), dim)
+    )
+    for indices, batch in iter_batches(texts, tokenizer, EMBED_BATCH_SIZE, MAX_LENGTH):
+        with torch.no_grad():
+            hidden = encoder(
+                input_ids=batch["input_ids"],
+                attention_mask=batch["attention_mask"]
+            ).last_hidden_state
+        embeddings[indices] = hidden[:, 0].numpy()
+    embeddings.flush()
+    del embeddings
+
+    np.save(labels_path, labels)
+
+    # Written last: an interrupted run leaves no valid-looking cache
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "rows": len(texts), "dim": dim}, f, indent=2)
+
+    print(f"Embedded {len(texts)} {split} invoices in {time.perf_counter() - start:.1f}s")
+    return np.load(array_path, mmap_mode="r"), labels
+
+# =========================
+# Classification Head
+# =========================
+
+class ClassificationHead(nn.Module):
+    """
+    Same layers as DistilBertForSequenceClassification on top of the
+    [CLS] embedding, so trained weights drop straight into that model.
+    """
+
+    def __init__(self, dim: int, num_labels: int, dropout: float):
+        super().__init__()
+        self.pre_classifier = nn.Linear(dim, dim)
+        self.dropout = nn.Dropout(dropout)
+        self.classifier = nn.Linear(dim, num_labels)
+
+    def forward(self, pooled):
+        hidden = F.relu(self.pre_classifier(pooled))
+        return self.classifier(self.dropout(hidden))
+
+
+def evaluate(head, embeddings, labels):
+    head.eval()
+    with torch.no_grad():
+        logits = head(torch.from_numpy(np.asarray(embeddings)))
+        targets = torch.from_numpy(labels)
+        loss = F.cross_entropy(logits, targets).item()
+        accuracy = (logits.argmax(dim=-1) == targets).float().mean().item()
+    return loss, accuracy
+
+
+def train_head(head, train_x, train_y, val_x, val_y, epochs: int):
+    """
+    Minibatch AdamW over cached embeddings; keeps the weights with the
+    lowest validation loss, like load_best_model_at_end.
+    """
+    optimizer = torch.optim.AdamW(
+        head.parameters(), lr=HEAD_LEARNING_RATE, weight_decay=HEAD_WEIGHT_DECAY
+    )
+    generator = torch.Generator().manual_seed(RANDOM_SEED)
+    targets = torch.from_numpy(train_y)
+
+    best = (float("inf"), 0.0, None, 0)
+
+    for epoch in range(1, epochs + 1):
+        head.train()
+        order = torch.randperm(len(train_y), generator=generator).numpy()
+        for start in range(0, len(order), HEAD_BATCH_SIZE):
+            # Sorted indices keep memmap reads sequential
+            idx = np.sort(order[start:start + HEAD_BATCH_SIZE])
+            logits = head(torch.from_numpy(np.asarray(train_x[idx])))
+            loss = F.cross_entropy(logits, targets[idx])
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+
+        val_loss, val_accuracy = evaluate(head, val_x, val_y)
+        if val_loss < best[0]:
+            state = {k: v.detach().clone() for k, v in head.state_dict().items()}
+            best = (val_loss, val_accuracy, state, epoch)
+
+    head.load_state_dict(best[2])
+    return {"val_loss": best[0], "val_accuracy": best[1], "best_epoch": best[3]}
+
+# =========================
+# Export
+# =========================
+
+def export_model(head, encoder: str, label_mapping, output_dir: Path, tokenizer):
+    """
+    Save encoder + trained head as a regular DistilBertForSequenceClassification
+    checkpoint, loadable by load_classifier().
+    """
+    id2label = {i: label for label, i in label_mapping.items()}
+    model = DistilBertForSequenceClassification.from_pretrained(
+        encoder,
+        num_labels=len(label_mapping),
+        id2label=id2label,
+        label2id=dict(label_mapping),
+        ignore_mismatched_sizes=True
+    )
+    model.pre_classifier.load_state_dict(head.pre_classifier.state_dict())
+    model.classifier.load_state_dict(head.classifier.state_dict())
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    return model
+
+# =========================
+# Main
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train only the classification head on cached frozen-encoder embeddings."
+    )
+    parser.add_argument("--encoder", default=None, help=f"default: {ENCODER}, else {FALLBACK_ENCODER}")
+    parser.add_argument("--epochs", type=int, default=HEAD_EPOCHS)
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    set_seed(RANDOM_SEED)
+
+    encoder_name = args.encoder or (ENCODER if Path(ENCODER, "config.json").exists() else FALLBACK_ENCODER)
+
+    with open(LABEL_MAPPING_FILE, "r", encoding="utf-8") as f:
+        label_mapping = json.load(f)
+
+    tokenizer = DistilBertTokenizerFast.from_pretrained(encoder_name)
+    encoder = DistilBertModel.from_pretrained(encoder_name)
+    encoder.eval()
+
+    encoder_id = encoder_fingerprint(encoder_name)
+    train_x, train_y = embed_split(TRAIN_FILE, tokenizer, encoder, encoder_id)
+    val_x, val_y = embed_split(VAL_FILE, tokenizer, encoder, encoder_id)
+
+    head = ClassificationHead(
+        encoder.config.dim, len(label_mapping), encoder.config.seq_classif_dropout
+    )
+
+    start = time.perf_counter()
+    result = train_head(head, train_x, train_y, val_x, val_y, args.epochs)
+    print(
+        f"Head trained in {time.perf_counter() - start:.1f}s: "
+        f"val_loss={result['val_loss']:.4f} val_accuracy={result['val_accuracy']:.4f} "
+        f"(epoch {result['best_epoch']})"
+    )
+
+    model = export_model(head, encoder_name, label_mapping, args.output, tokenizer)
+
+    # The exported model must reproduce the head on the cached embeddings
+    model.eval()
+    head.eval()
+    with torch.no_grad():
+        pooled = torch.from_numpy(np.asarray(val_x))
+        exported = model.classifier(F.relu(model.pre_classifier(pooled)))
+        max_diff = (exported - head(pooled)).abs().max().item()
+    print(f"Export check: max logit difference {max_diff:.2e}")
+
+    print("Model saved to:", args.output)
+    print(f"Serve it with MODEL_DIR={args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from src.ocr.text_normalizer import NOISE_CHARS, normalize_text
+
+# =========================
+# Configuration
+# =========================
+
+OCR_INPUT_DIR = Path("data/ocr_text")
+NORMALIZED_DIR = Path("data/ocr_text_normalized")
+
+FUZZ_CASES = 100_000
+RANDOM_SEED = 42
+
+# =========================
+# Reference Implementation
+# =========================
+
+# The batch normalizer as it was before the shared module: several regex
+# passes, a split and a per-line loop. Kept to check that the shared
+# normalizer's output is unchanged.
+NOISE_CHARS_PATTERN = re.compile(r"[■•●◦▪︎]")
+MULTISPACE_PATTERN = re.compile(r"[ \t]+")
+MULTINEWLINE_PATTERN = re.compile(r"\n{3,}")
+EMPTY_LINE_PATTERN = re.compile(r"^\s*$")
+
+
+def reference_normalize_text(raw_text: str) -> str:
+    text = NOISE_CHARS_PATTERN.sub(" ", raw_text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = text.lower()
+
+    lines = []
+    for line in text.split("\n"):
+        line = MULTISPACE_PATTERN.sub(" ", line).strip()
+        if not EMPTY_LINE_PATTERN.match(line):
+            lines.append(line)
+
+    normalized = "\n".join(lines)
+    normalized = MULTINEWLINE_PATTERN.sub("\n\n", normalized)
+
+    return normalized.strip()
+
+# =========================
+# Parity
+# =========================
+
+def check_committed_outputs() -> int:
+    """
+    Normalizing data/ocr_text must reproduce data/ocr_text_normalized.
+    """
+    mismatches = 0
+    for raw_file in sorted(OCR_INPUT_DIR.glob("*.txt")):
+        expected_file = NORMALIZED_DIR / raw_file.name
+        if not expected_file.exists():
+            continue
+        raw_text = raw_file.read_text(encoding="utf-8")
+        if normalize_text(raw_text) != expected_file.read_text(encoding="utf-8"):
+            mismatches += 1
+            print(f"  mismatch: {raw_file.name}")
+    return mismatches
+
+
+def fuzz_cases(count: int) -> List[str]:
+    """
+    Short random strings over the characters the normalizer treats
+    specially: every whitespace kind, line endings, noise characters and
+    letters whose lowercase depends on context (final sigma) or changes
+    length (dotted capital I).
+    """
+    alphabet = list("aZ ΣΑσİ\t\r\n\x0b\x0c\x85  ") + list(NOISE_CHARS) + ["\r\n", "  "]
+    rng = random.Random(RANDOM_SEED)
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 24))) for _ in range(count)]
+
+
+def check_reference(texts: List[str]) -> int:
+    mismatches = 0
+    for text in texts:
+        if normalize_text(text) != reference_normalize_text(text):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  mismatch: {text!r}")
+    return mismatches
+
+# =========================
+# Throughput
+# =========================
+
+def throughput_mb_s(fn: Callable[[str], str], texts: List[str], repeat: int) -> float:
+    size_mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return size_mb / best
+
+# =========================
+# Main
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the shared normalizer against the previous batch normalizer and measure throughput."
+    )
+    parser.add_argument("--fuzz-cases", type=int, default=FUZZ_CASES)
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs; the best is reported")
+    args = parser.parse_args()
+
+    texts = [p.read_text(encoding="utf-8") for p in sorted(OCR_INPUT_DIR.glob("*.txt"))]
+    if not texts:
+        raise SystemExit(f"No OCR text in {OCR_INPUT_DIR}")
+
+    failures = 0
+
+    committed = check_committed_outputs()
+    print(f"Committed outputs ({NORMALIZED_DIR}): {committed} mismatches")
+    failures += committed
+
+    real = check_reference(texts)
+    print(f"Reference on {len(texts)} OCR documents: {real} mismatches")
+    failures += real
+
+    fuzz = check_reference(fuzz_cases(args.fuzz_cases))
+    print(f"Reference on {args.fuzz_cases} edge-case strings: {fuzz} mismatches")
+    failures += fuzz
+
+    size_mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    print(f"Throughput over {len(texts)} documents ({size_mb:.2f} MB), best of {args.repeat}:")
+    reference = throughput_mb_s(reference_normalize_text, texts, args.repeat)
+    shared = throughput_mb_s(normalize_text, texts, args.repeat)
+    print(f"  previous batch normalizer: {reference:8.1f} MB/s")
+    print(f"  shared normalizer:         {shared:8.1f} MB/s ({shared / reference:.1f}x)")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,26 @@
-import pytesseract
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
 from pathlib import Path
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from src.pipeline.progress import Progress
+
+try:
+    import psutil
+except ImportError:  # memory reporting is optional
+    psutil = None
 
 # =========================
 # Configuration
@@ -9,36 +29,396 @@ from pdf2image import convert_from_path
 PDF_INPUT_DIR = Path("data/raw_pdfs")
 TEXT_OUTPUT_DIR = Path("data/ocr_text")
 
-TEXT_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+# Which PDFs have current text outputs, and which failed on the last run
+OCR_MANIFEST_FILE = Path("data/ocr_manifest.jsonl")
+OCR_ERRORS_FILE = Path("data/ocr_errors.jsonl")
+
+# Max Tesseract processes running at once in this process. Pages of one
+# document (and pages of concurrent documents) share this cap.
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", str(os.cpu_count() or 1)))
+
+DPI = 300
+
+# Per-document limits. A4 at 300 DPI is ~8.7M pixels, so the default
+# pixel budget allows roughly 200 full pages.
+MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "200"))
+MAX_PIXELS_PER_DOCUMENT = int(os.getenv("OCR_MAX_PIXELS", str(1_750_000_000)))
+
+# If Tesseract is not on PATH, set it explicitly, e.g.
+# TESSERACT_CMD="C:\Program Files\Tesseract-OCR\tesseract.exe"
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
+
+# Parallelism comes from running pages side by side, so keep each
+# Tesseract process single-threaded to avoid oversubscribing cores.
+# Set only in Tesseract's own environment: in this interpreter it would
+# also cap torch's OpenMP threads.
+TESSERACT_ENV = {**os.environ, "OMP_THREAD_LIMIT": os.getenv("OCR_OMP_THREAD_LIMIT", "1")}
+
+# pdfinfo reports "Page size" for a single page and "Page    N size"
+# for each page of a -f/-l range, e.g. "612 x 792 pts (letter)"
+PAGE_SIZE_KEY = re.compile(r"^Page(?:\s+(\d+))?\s+size$")
+PAGE_SIZE_POINTS = re.compile(r"^([\d.]+)\s*x\s*([\d.]+)\s*pts")
+
+# =========================
+# Streaming Rasterizer
+# =========================
+
+class DocumentTooLarge(ValueError):
+    """
+    Raised when a PDF exceeds the page or pixel budget.
+    """
+
+
+class RasterStats:
+    """
+    Memory accounting for one document.
+    """
+
+    def __init__(self):
+        self.pages = 0
+        self.pixels = 0
+        self.peak_page_bytes = 0
+        self.peak_rss_bytes = 0
+
+    def record_page(self, image):
+        self.pages += 1
+        self.pixels += image.width * image.height
+        page_bytes = image.width * image.height * len(image.getbands())
+        self.peak_page_bytes = max(self.peak_page_bytes, page_bytes)
+        if psutil is not None:
+            rss = psutil.Process().memory_info().rss
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+
+    def as_dict(self):
+        return {
+            "pages": self.pages,
+            "pixels": self.pixels,
+            "peak_page_mb": round(self.peak_page_bytes / 2**20, 1),
+            "peak_rss_mb": round(self.peak_rss_bytes / 2**20, 1)
+        }
 
-# If Tesseract is not on PATH, uncomment and set explicitly:
-# pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+def page_sizes(pdf_path: Path, page_count: int) -> Dict[int, Tuple[float, float]]:
+    """
+    (width, height) in points of each page, by page number, from pdfinfo.
+    Pages pdfinfo does not report are left out.
+    """
+    info = pdfinfo_from_path(pdf_path, first_page=1, last_page=page_count)
+
+    sizes = {}
+    for key, value in info.items():
+        key_match = PAGE_SIZE_KEY.match(key.strip())
+        points = PAGE_SIZE_POINTS.match(str(value).strip())
+        if key_match and points:
+            sizes[int(key_match.group(1) or 1)] = (float(points.group(1)), float(points.group(2)))
+    return sizes
+
+
+def page_pixels(size: Tuple[float, float], dpi: int) -> int:
+    """
+    Pixels of a page rendered at `dpi` (72 points per inch).
+    """
+    width_pt, height_pt = size
+    return math.ceil(width_pt / 72 * dpi) * math.ceil(height_pt / 72 * dpi)
+
+
+def iter_pages(
+    pdf_path: Path,
+    dpi: int = DPI,
+    max_pages: int = MAX_PAGES,
+    max_pixels: int = MAX_PIXELS_PER_DOCUMENT,
+    stats: Optional[RasterStats] = None
+) -> Iterator:
+    """
+    Rasterize a PDF one page at a time. Only the page being yielded is
+    held by this generator, so peak memory does not grow with length.
+
+    The pixel budget is checked against the page sizes pdfinfo reports
+    before anything is rendered, so an oversized page is never
+    rasterized; the rendered pages are counted again as a backstop.
+    """
+    page_count = pdfinfo_from_path(pdf_path)["Pages"]
+    if page_count > max_pages:
+        raise DocumentTooLarge(
+            f"{pdf_path.name}: {page_count} pages exceeds limit of {max_pages}"
+        )
+
+    estimated = sum(page_pixels(size, dpi) for size in page_sizes(pdf_path, page_count).values())
+    if estimated > max_pixels:
+        raise DocumentTooLarge(
+            f"{pdf_path.name}: {estimated} pixels at {dpi} DPI exceeds pixel budget of {max_pixels}"
+        )
+
+    stats = stats if stats is not None else RasterStats()
+
+    for page_number in range(1, page_count + 1):
+        image = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=page_number,
+            last_page=page_number
+        )[0]
+
+        stats.record_page(image)
+        if stats.pixels > max_pixels:
+            image.close()
+            raise DocumentTooLarge(
+                f"{pdf_path.name}: exceeds pixel budget of {max_pixels} "
+                f"at page {page_number}"
+            )
+
+        yield image
+
+# =========================
+# Page Worker Pool
+# =========================
+
+_page_pool: Optional[ThreadPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+
+def set_page_workers(workers: int):
+    """
+    Resize the page pool, e.g. when this process is one of several OCR
+    worker processes sharing the machine.
+    """
+    global OCR_PAGE_WORKERS, _page_pool
+
+    with _page_pool_lock:
+        OCR_PAGE_WORKERS = max(1, workers)
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=True)
+            _page_pool = None
+
+
+def _get_page_pool() -> ThreadPoolExecutor:
+    # Threads suffice: each page is OCR'd by a Tesseract subprocess
+    global _page_pool
+
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ThreadPoolExecutor(
+                max_workers=OCR_PAGE_WORKERS,
+                thread_name_prefix="ocr-page"
+            )
+        return _page_pool
+
+
+def _ocr_image(image) -> str:
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = Path(tmp_dir) / "page.png"
+            image.save(image_path)
+            result = subprocess.run(
+                [TESSERACT_CMD, str(image_path), "stdout", "-l", "eng"],
+                env=TESSERACT_ENV,
+                capture_output=True,
+                check=True
+            )
+        return result.stdout.decode("utf-8")
+    finally:
+        # Free the page bitmap as soon as its text is extracted
+        image.close()
+
+
+def ocr_images(images) -> List[str]:
+    """
+    OCR page images in parallel, returning text in page order.
+
+    `images` may be a lazy iterator; at most OCR_PAGE_WORKERS pages are
+    in flight, so the next page is only rasterized once a slot frees up.
+    """
+    pool = _get_page_pool()
+    window = deque()
+    texts = []
+
+    for image in images:
+        window.append(pool.submit(_ocr_image, image))
+        if len(window) >= OCR_PAGE_WORKERS:
+            texts.append(window.popleft().result())
+
+    while window:
+        texts.append(window.popleft().result())
+
+    return texts
 
 # =========================
 # OCR Logic
 # =========================
 
-def ocr_pdf(pdf_path: Path) -> str:
-    images = convert_from_path(pdf_path, dpi=300)
+def ocr_pdf(pdf_path: Path, stats: Optional[RasterStats] = None) -> str:
+    pages = iter_pages(pdf_path, stats=stats)
     extracted_text = []
 
-    for page_number, image in enumerate(images, start=1):
-        text = pytesseract.image_to_string(image, lang="eng")
+    for page_number, text in enumerate(ocr_images(pages), start=1):
         extracted_text.append(f"\n--- PAGE {page_number} ---\n{text}")
 
     return "\n".join(extracted_text)
 
 
+def ocr_pdf_bytes(pdf_bytes: bytes, stats: Optional[RasterStats] = None) -> str:
+    """
+    OCR an uploaded PDF held in memory (API path).
+    Kept free of model imports so it can run in a worker process.
+    """
+    # pdftoppm reads from disk anyway; spooling once lets every page be
+    # rasterized from the same file.
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = Path(tmp_dir) / "upload.pdf"
+        pdf_path.write_bytes(pdf_bytes)
+        # Same raw text as the offline path; normalization is shared too
+        return ocr_pdf(pdf_path, stats=stats)
+
+
+# =========================
+# Bulk OCR
+# =========================
+
+def write_text_atomic(path: Path, text: str):
+    """
+    Write via a temporary file in the same directory and rename it into
+    place, so a crash never leaves a truncated output behind.
+    """
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_ocr_manifest(path: Path = OCR_MANIFEST_FILE) -> Dict[str, Dict[str, Any]]:
+    """
+    PDF name -> entry of its last successful OCR (the last line wins).
+    """
+    entries = {}
+    if not path.exists():
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line from an interrupted run
+                continue
+            entries[entry["pdf"]] = entry
+    return entries
+
+
+def is_current(pdf_file: Path, entry: Optional[Dict[str, Any]], check: str) -> bool:
+    """
+    Whether the PDF's text output is up to date. "stat" compares size and
+    mtime; "hash" compares content, so touched-but-unchanged PDFs are
+    skipped too.
+    """
+    if entry is None or not (TEXT_OUTPUT_DIR / entry["output"]).exists():
+        return False
+    stat = pdf_file.stat()
+    if entry["size"] != stat.st_size:
+        return False
+    if check == "hash":
+        return entry["sha256"] == file_sha256(pdf_file)
+    return entry["mtime_ns"] == stat.st_mtime_ns
+
+
+def ocr_to_file(pdf_file: Path) -> Dict[str, Any]:
+    """
+    OCR one PDF into TEXT_OUTPUT_DIR. Runs in a worker process; returns
+    the manifest entry for the output.
+    """
+    stat = pdf_file.stat()
+    sha256 = file_sha256(pdf_file)
+
+    stats = RasterStats()
+    text = ocr_pdf(pdf_file, stats=stats)
+    output_file = TEXT_OUTPUT_DIR / f"{pdf_file.stem}.txt"
+    write_text_atomic(output_file, text)
+
+    return {
+        "pdf": pdf_file.name,
+        "output": output_file.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256,
+        "pages": stats.pages,
+        "peak_rss_mb": stats.as_dict()["peak_rss_mb"],
+    }
+
+
 def main():
-    pdf_files = list(PDF_INPUT_DIR.glob("*.pdf"))
+    cpu_count = os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description="OCR raw invoice PDFs into text files.")
+    parser.add_argument("--workers", type=int, default=cpu_count, help="worker processes (PDFs in parallel)")
+    parser.add_argument("--page-workers", type=int, default=None,
+                        help="Tesseract processes per worker (default: cores / workers)")
+    parser.add_argument("--check", choices=("stat", "hash"), default="stat",
+                        help="how to tell an existing output is current")
+    parser.add_argument("--force", action="store_true", help="OCR every PDF again")
+    args = parser.parse_args()
+
+    TEXT_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    page_workers = args.page_workers or max(1, cpu_count // max(1, args.workers))
+
+    manifest = load_ocr_manifest()
+    pdf_files = sorted(PDF_INPUT_DIR.glob("*.pdf"))
+    pending = [
+        pdf_file for pdf_file in pdf_files
+        if args.force or not is_current(pdf_file, manifest.get(pdf_file.name), args.check)
+    ]
+    print(f"OCR: {len(pending)}/{len(pdf_files)} PDFs need processing")
+
+    progress = Progress(len(pending), "OCR'd PDFs")
+    errors = []
+    peak_rss_mb = 0.0
+
+    with ProcessPoolExecutor(
+        max_workers=max(1, args.workers),
+        initializer=set_page_workers,
+        initargs=(page_workers,)
+    ) as pool, open(OCR_MANIFEST_FILE, "a", encoding="utf-8") as manifest_file:
+        futures = {pool.submit(ocr_to_file, pdf_file): pdf_file for pdf_file in pending}
+
+        for future in as_completed(futures):
+            pdf_file = futures[future]
+            try:
+                entry = future.result()
+            except Exception as exc:
+                errors.append({
+                    "pdf": pdf_file.name,
+                    "error": type(exc).__name__,
+                    "message": str(exc),
+                    "failed_at": datetime.utcnow().isoformat() + "Z",
+                })
+                print(f"OCR failed for {pdf_file.name}: {exc!r}")
+            else:
+                # Recorded as soon as the output is in place, so an
+                # interrupted run resumes with the remaining PDFs
+                manifest_file.write(json.dumps(entry) + "\n")
+                manifest_file.flush()
+                manifest[entry["pdf"]] = entry
+                peak_rss_mb = max(peak_rss_mb, entry["peak_rss_mb"])
+            progress.update(1)
 
-    for pdf_file in pdf_files:
-        text = ocr_pdf(pdf_file)
-        output_file = TEXT_OUTPUT_DIR / f"{pdf_file.stem}.txt"
+    # One line per PDF again, and this run's failures (empty if none)
+    write_text_atomic(OCR_MANIFEST_FILE, "".join(json.dumps(e) + "\n" for e in manifest.values()))
+    write_text_atomic(OCR_ERRORS_FILE, "".join(json.dumps(e) + "\n" for e in errors))
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(text)
+    progress.report(force=True)
+    print(
+        f"OCR complete for {len(pending) - len(errors)} PDFs, {len(errors)} failed "
+        f"(see {OCR_ERRORS_FILE}); {len(pdf_files) - len(pending)} already current "
+        f"(peak worker RSS {peak_rss_mb} MB)"
+    )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,42 @@
+import re
+
+# =========================
+# Configuration
+# =========================
+
+# Part of the API's cache fingerprints: bump whenever the output of
+# normalize_text changes, so cached classifications are recomputed
+NORMALIZER_VERSION = 1
+
+# Characters commonly introduced by OCR noise
+NOISE_CHARS = "■•●◦▪︎"
+
+# Per-character substitutions: noise and tabs become spaces, carriage
+# returns become newlines ("\r\n" turns into an empty line, which is
+# dropped like any other). str.replace is used rather than translate,
+# which falls back to a slow path on non-ASCII text.
+_REPLACEMENTS = [(c, " ") for c in NOISE_CHARS] + [("\t", " "), ("\r", "\n")]
+
+# Runs of spaces inside a line
+_SPACES = re.compile(r" {2,}")
+
+# =========================
+# Normalizer
+# =========================
+
+def normalize_text(raw_text: str) -> str:
+    """
+    Normalize OCR text while preserving country-discriminative signals:
+    strip OCR noise characters, lowercase, collapse spaces and tabs within
+    lines, trim lines and drop empty ones.
+
+    Shared by the API and the offline pipeline, so the model sees the
+    same input either way. Every step is a whole-string pass in C; no
+    Python code runs per line or per character.
+    """
+    text = raw_text
+    for old, new in _REPLACEMENTS:
+        text = text.replace(old, new)
+
+    text = _SPACES.sub(" ", text.lower())
+    return "\n".join(filter(None, map(str.strip, text.split("\n"))))
@@ -0,0 +1,49 @@
+import time
+
+# =========================
+# Configuration
+# =========================
+
+PROGRESS_INTERVAL_S = 5.0
+
+# =========================
+# Progress
+# =========================
+
+class Progress:
+    """
+    Prints items done, rate and ETA at most every `interval_s`.
+    """
+
+    def __init__(self, total: int, label: str = "Processed", interval_s: float = PROGRESS_INTERVAL_S):
+        self.total = total
+        self.label = label
+        self.interval = interval_s
+        self.done = 0
+        self._start = time.perf_counter()
+        self._reported_at = self._start
+
+    def update(self, count: int):
+        self.done += count
+        self.report()
+
+    def set(self, done: int):
+        self.done = done
+        self.report()
+
+    def report(self, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self._reported_at < self.interval:
+            return
+        self._reported_at = now
+        print(self.line(now))
+
+    def line(self, now: float = None) -> str:
+        elapsed = (now or time.perf_counter()) - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = f"{remaining / rate:.0f}s" if rate > 0 else "?"
+        return (
+            f"{self.label} {self.done}/{self.total} "
+            f"({rate:.1f}/s, elapsed {elapsed:.0f}s, ETA {eta})"
+        )
@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.classification.build_training_dataset import load_ground_truth
+from src.ocr.normalize_ocr_text import NORMALIZED_OUTPUT_DIR
+from src.ocr.ocr_invoices import PDF_INPUT_DIR, TEXT_OUTPUT_DIR, ocr_pdf, write_text_atomic
+from src.ocr.text_normalizer import normalize_text
+from src.pipeline.stages import QUEUE_SIZE, Pipeline, Stage
+from src.routing.route_invoices import BATCH_SIZE, OUTPUT_FILE, Router, open_decision_log
+
+# =========================
+# Configuration
+# =========================
+
+# Documents OCR'd at once; their pages share the Tesseract page pool
+OCR_WORKERS = int(os.getenv("PIPELINE_OCR_WORKERS", "4"))
+NORMALIZE_WORKERS = int(os.getenv("PIPELINE_NORMALIZE_WORKERS", "1"))
+CLASSIFY_WORKERS = int(os.getenv("PIPELINE_CLASSIFY_WORKERS", "1"))
+
+# Invoices per classification batch, and max wait to fill one
+CLASSIFY_BATCH_WAIT_MS = 200.0
+
+# Training records (normalized text + ground-truth label), as written
+# by build_training_dataset
+DATASET_FILE = Path("data/training/country_classification_dataset.jsonl")
+
+METRICS_FILE = Path("outputs/pipeline_metrics.json")
+
+# =========================
+# Stages
+# =========================
+
+def write_text(directory: Path, stem: str, text: str):
+    write_text_atomic(directory / f"{stem}.txt", text)
+
+
+def build_pipeline(args, router: Router, decision_log, dataset) -> Pipeline:
+    """
+    PDF -> OCR -> normalize -> classify -> route, each stage with its own
+    workers, joined by bounded queues. Items are (stem, payload) pairs.
+    """
+
+    def ocr(pdf_path: Path) -> Tuple[str, str]:
+        text = ocr_pdf(pdf_path)
+        if args.write_intermediates:
+            write_text(TEXT_OUTPUT_DIR, pdf_path.stem, text)
+        return pdf_path.stem, text
+
+    def normalize(item: Tuple[str, str]) -> Optional[Tuple[str, str]]:
+        stem, raw_text = item
+        text = normalize_text(raw_text)
+        if args.write_intermediates:
+            write_text(NORMALIZED_OUTPUT_DIR, stem, text)
+        if dataset is not None:
+            dataset.add(stem, text)
+        # Empty OCR output has nothing to classify
+        return (stem, text) if text else None
+
+    def classify(batch: List[Tuple[str, str]]):
+        classified = router.classify(router.prepare_texts([text for _, text in batch]))
+        return [(stem, result) for (stem, _), result in zip(batch, classified)]
+
+    def route(batch):
+        decisions = router.decisions([stem for stem, _ in batch], [result for _, result in batch])
+        decision_log.append_many(decisions)
+        return []
+
+    return Pipeline(
+        [
+            Stage("ocr", ocr, workers=args.ocr_workers, queue_size=args.queue_size),
+            Stage("normalize", normalize, workers=args.normalize_workers, queue_size=args.queue_size),
+            Stage(
+                "classify",
+                classify,
+                workers=args.classify_workers,
+                queue_size=args.queue_size,
+                batch_size=args.batch_size,
+                batch_wait_ms=CLASSIFY_BATCH_WAIT_MS
+            ),
+            Stage("route", route, queue_size=args.queue_size, batch_size=args.batch_size),
+        ],
+        report_interval_s=args.report_interval
+    )
+
+
+class DatasetWriter:
+    """
+    Appends training records for invoices with a ground-truth label.
+    """
+
+    def __init__(self, path: Path):
+        self.labels = load_ground_truth()
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def add(self, stem: str, text: str):
+        # Called from every normalize worker
+        if stem in self.labels and text:
+            line = json.dumps({"text": text, "label": self.labels[stem]}) + "\n"
+            with self._lock:
+                self._file.write(line)
+                self.records += 1
+
+    def close(self):
+        self._file.close()
+
+# =========================
+# Main
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run OCR, normalization, classification and routing as one streaming pipeline."
+    )
+    parser.add_argument("--ocr-workers", type=int, default=OCR_WORKERS)
+    parser.add_argument("--normalize-workers", type=int, default=NORMALIZE_WORKERS)
+    parser.add_argument("--classify-workers", type=int, default=CLASSIFY_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="invoices per classification batch")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="items buffered before each stage")
+    parser.add_argument("--write-intermediates", action="store_true",
+                        help=f"also write {TEXT_OUTPUT_DIR} and {NORMALIZED_OUTPUT_DIR}")
+    parser.add_argument("--dataset", action="store_true",
+                        help=f"also write labelled training records to {DATASET_FILE}")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.write_intermediates:
+        TEXT_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        NORMALIZED_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    pdf_files = sorted(PDF_INPUT_DIR.glob("*.pdf"))
+    print(f"Pipeline: {len(pdf_files)} PDFs")
+
+    router = Router(args.batch_size)
+    dataset = DatasetWriter(DATASET_FILE) if args.dataset else None
+    decision_log = open_decision_log()
+
+    try:
+        metrics = build_pipeline(args, router, decision_log, dataset).run(pdf_files)
+    finally:
+        decision_log.close()
+        if dataset is not None:
+            dataset.close()
+
+    METRICS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(METRICS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"pdfs": len(pdf_files), "stages": metrics}, f, indent=2)
+
+    print(router.summary())
+    if dataset is not None:
+        print(f"Training records written to {DATASET_FILE}: {dataset.records}")
+    print(f"Routing decisions written to {OUTPUT_FILE}; stage metrics in {METRICS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
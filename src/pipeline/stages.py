@@ -0,0 +1,223 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# =========================
+# Configuration
+# =========================
+
+QUEUE_SIZE = 64
+REPORT_INTERVAL_S = 5.0
+
+# Marks the end of a stage's input
+_END = object()
+
+# =========================
+# Stage
+# =========================
+
+class Stage:
+    """
+    One step of a streaming pipeline, run by `workers` threads.
+
+    Each worker takes items from the stage's bounded input queue, calls
+    `fn` and puts the result on the next stage's queue. A full queue
+    blocks the stage feeding it, so no stage runs more than
+    `queue_size` items ahead of the one after it.
+
+    With `batch_size` > 1, `fn` receives a list of up to that many items
+    (waiting at most `batch_wait_ms` to fill it) and returns a list.
+    `fn` returning None drops the item; an exception is counted, printed
+    and drops it too, so one bad document never stops the run.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        workers: int = 1,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = 1,
+        batch_wait_ms: float = 50.0
+    ):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+
+        self._lock = threading.Lock()
+        self._alive = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self._occupancy_sum = 0
+        self._occupancy_max = 0
+        self._samples = 0
+
+    def _take(self) -> List[Any]:
+        """
+        Next item or batch; an empty list once the input has ended.
+        """
+        item = self.queue.get()
+        if item is _END:
+            return []
+        if self.batch_size <= 1:
+            return [item]
+
+        batch = [item]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                # Leave the marker for this worker's next take
+                self.queue.put(_END)
+                break
+            batch.append(item)
+        return batch
+
+    def _work(self, emit: Callable[[Any], None]):
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+
+            start = time.perf_counter()
+            try:
+                result = self.fn(batch if self.batch_size > 1 else batch[0])
+            except Exception as exc:
+                result = None
+                with self._lock:
+                    self.errors += len(batch)
+                print(f"Stage {self.name}: {exc!r}")
+            elapsed = time.perf_counter() - start
+
+            outputs = (result or []) if self.batch_size > 1 else ([] if result is None else [result])
+            with self._lock:
+                self.items_in += len(batch)
+                self.items_out += len(outputs)
+                self.busy_s += elapsed
+
+            for output in outputs:
+                emit(output)
+
+    def sample(self):
+        depth = self.queue.qsize()
+        with self._lock:
+            self._samples += 1
+            self._occupancy_sum += depth
+            self._occupancy_max = max(self._occupancy_max, depth)
+
+    def metrics(self, elapsed_s: float) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "items_in": self.items_in,
+                "items_out": self.items_out,
+                "errors": self.errors,
+                "items_per_s": round(self.items_in / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+                # Share of worker time spent in `fn` rather than waiting
+                "utilization": round(self.busy_s / (elapsed_s * self.workers), 3) if elapsed_s > 0 else 0.0,
+                "queue_size": self.queue.maxsize,
+                "queue_depth": self.queue.qsize(),
+                "queue_avg": round(self._occupancy_sum / self._samples, 1) if self._samples else 0.0,
+                "queue_max": self._occupancy_max,
+            }
+
+# =========================
+# Pipeline
+# =========================
+
+class Pipeline:
+    """
+    Stages joined by their bounded queues, fed from an iterable.
+
+    Every stage runs concurrently. While running, a line per stage with
+    its throughput and input-queue occupancy is printed every
+    `report_interval_s`: the bottleneck is the stage whose queue stays
+    full while the queues after it stay empty.
+    """
+
+    def __init__(self, stages: List[Stage], report_interval_s: float = REPORT_INTERVAL_S):
+        self.stages = stages
+        self.report_interval = report_interval_s
+        self._start: Optional[float] = None
+        self._done = threading.Event()
+
+    def run(self, source: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        self._start = time.perf_counter()
+        self._done.clear()
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            following = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            stage._alive = stage.workers
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, following),
+                    name=f"{stage.name}-{n}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        monitor = threading.Thread(target=self._monitor, name="pipeline-monitor", daemon=True)
+        monitor.start()
+
+        first = self.stages[0]
+        for item in source:
+            first.queue.put(item)
+        for _ in range(first.workers):
+            first.queue.put(_END)
+
+        for thread in threads:
+            thread.join()
+        self._done.set()
+        monitor.join()
+
+        metrics = self.metrics()
+        self.report(metrics)
+        return metrics
+
+    def _worker(self, stage: Stage, following: Optional[Stage]):
+        emit = following.queue.put if following is not None else (lambda _: None)
+        try:
+            stage._work(emit)
+        finally:
+            with stage._lock:
+                stage._alive -= 1
+                last = stage._alive == 0
+            # The last worker out ends the next stage's input
+            if last and following is not None:
+                for _ in range(following.workers):
+                    following.queue.put(_END)
+
+    def _monitor(self):
+        next_report = time.monotonic() + self.report_interval
+        while not self._done.wait(0.2):
+            for stage in self.stages:
+                stage.sample()
+            if time.monotonic() >= next_report:
+                next_report += self.report_interval
+                self.report(self.metrics())
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        elapsed = time.perf_counter() - self._start
+        return {stage.name: stage.metrics(elapsed) for stage in self.stages}
+
+    def report(self, metrics: Dict[str, Dict[str, Any]]):
+        for name, m in metrics.items():
+            print(
+                f"  {name:<10} {m['items_in']:>7} in  {m['items_per_s']:>8.2f}/s  "
+                f"busy {m['utilization']:>6.1%}  "
+                f"queue {m['queue_depth']}/{m['queue_size']} (avg {m['queue_avg']}, max {m['queue_max']})  "
+                f"errors {m['errors']}"
+            )
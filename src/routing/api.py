@@ -1,20 +1,226 @@
+import json
+import os
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from fastapi import APIRouter
+from typing import Any, Dict, Iterator, Literal, Optional
 
+from fastapi import APIRouter, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from .decision_feed import DecisionFeed
+from .decision_repository import DecisionFilters, DecisionRepository
 from .file_repository import FileDecisionRepository
+from .sqlite_repository import SqliteDecisionRepository
 
 router = APIRouter(prefix="/decisions", tags=["Routing Decisions"])
 
 # Must match where decisions are written
+DECISION_STORE = os.getenv("DECISION_STORE", "file")
 DECISIONS_FILE_PATH = Path("outputs/routing_decisions.jsonl")
+DECISIONS_DB_PATH = Path(os.getenv("DECISIONS_DB_PATH", "outputs/routing_decisions.db"))
+
+MAX_PAGE_SIZE = 1000
+
+# Records serialized per chunk of a streamed full listing
+STREAM_CHUNK_SIZE = 500
+
+# Live feed: fallback poll for decisions written by other processes,
+# and how many events a subscriber may fall behind before it is dropped
+FEED_POLL_MS = float(os.getenv("DECISION_FEED_POLL_MS", "500"))
+FEED_QUEUE_SIZE = int(os.getenv("DECISION_FEED_QUEUE_SIZE", "256"))
+
+# Opened by the app's lifespan (open_store), not at import
+repository: Optional[DecisionRepository] = None
+feed: Optional[DecisionFeed] = None
+
+
+def open_store() -> DecisionFeed:
+    """
+    Open the decision store and its live feed.
+    """
+    global repository, feed
+
+    if DECISION_STORE == "sqlite":
+        repository = SqliteDecisionRepository(DECISIONS_DB_PATH)
+    else:
+        repository = FileDecisionRepository(DECISIONS_FILE_PATH)
+
+    feed = DecisionFeed(repository, poll_interval_ms=FEED_POLL_MS, queue_size=FEED_QUEUE_SIZE)
+    return feed
+
+
+async def close_store():
+    global repository, feed
+
+    if feed is not None:
+        await feed.close()
+    if repository is not None:
+        repository.close()
+    repository = None
+    feed = None
+
+
+def _chunks(records: Iterator[Dict[str, Any]]) -> Iterator[list]:
+    while True:
+        chunk = list(islice(records, STREAM_CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _json_body(meta: Dict[str, Any], records: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """
+    The get_all_decisions() payload, produced one chunk of records at a time.
+    """
+    yield '{"meta": ' + json.dumps(meta) + ', "decisions": ['
+    separator = ""
+    for chunk in _chunks(records):
+        yield separator + ", ".join(json.dumps(r) for r in chunk)
+        separator = ", "
+    yield "]}"
+
+
+def _ndjson_body(records: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for chunk in _chunks(records):
+        yield "".join(json.dumps(r) + "\n" for r in chunk)
+
 
-repository = FileDecisionRepository(DECISIONS_FILE_PATH)
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def stream_all_decisions(request: Request, output: Optional[str]) -> Response:
+    """
+    Every decision, streamed as chunked JSON (same schema as before) or
+    NDJSON, with an ETag derived from the store's version. A client
+    sending the ETag back in If-None-Match gets an empty 304 while
+    nothing has been appended.
+    """
+    if output is None:
+        accept = request.headers.get("accept", "")
+        output = "ndjson" if "application/x-ndjson" in accept else "json"
+
+    etag = f'"{repository.get_version()}-{output}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    version, count, records = repository.stream_decisions()
+    headers["ETag"] = f'"{version}-{output}"'
+
+    if output == "ndjson":
+        headers["X-Total-Count"] = str(count)
+        return StreamingResponse(_ndjson_body(records), media_type="application/x-ndjson", headers=headers)
+
+    meta = {
+        "source": repository.source,
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "count": count,
+    }
+    return StreamingResponse(_json_body(meta, records), media_type="application/json", headers=headers)
 
 
 @router.get("")
-def get_decisions():
+def get_decisions(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, ge=0),
+    country: Optional[str] = None,
+    region: Optional[str] = None,
+    routing_code: Optional[str] = None,
+    transport_mode: Optional[str] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    output: Optional[Literal["json", "ndjson"]] = Query(None, alias="format"),
+):
     """
-    Returns all routing decisions.
+    Returns routing decisions.
     Read-only endpoint.
+
+    Without parameters, streams every decision (see
+    stream_all_decisions); `format=ndjson` or `Accept:
+    application/x-ndjson` selects NDJSON. With `limit`, `cursor` or
+    any filter, returns one page; pass `meta.next_cursor` back as
+    `cursor` for the next one. `transport_mode` matches the primary
+    transport. `since`/`until` bound the decision timestamp (ISO-8601
+    UTC); log segments outside the window are skipped.
     """
-    return repository.get_all_decisions()
\ No newline at end of file
+    filters = DecisionFilters(
+        country=country,
+        region=region,
+        routing_code=routing_code,
+        transport_mode=transport_mode,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence,
+        since=since,
+        until=until,
+    )
+
+    paged = limit is not None or cursor is not None
+    filtered = any(v is not None for v in vars(filters).values())
+
+    if not paged and not filtered:
+        return stream_all_decisions(request, output)
+
+    return repository.query_decisions(filters, limit=limit or 100, cursor=cursor)
+
+
+@router.get("/stats")
+def get_decision_stats(
+    country: Optional[str] = None,
+    region: Optional[str] = None,
+    routing_code: Optional[str] = None,
+    transport_mode: Optional[str] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    confidence_band: Optional[Literal["low", "medium", "high"]] = None,
+):
+    """
+    Returns the dashboard distributions for the matching decisions.
+    Served from counters maintained as decisions are appended, so the
+    payload and cost do not grow with history.
+    """
+    filters = DecisionFilters(
+        country=country,
+        region=region,
+        routing_code=routing_code,
+        transport_mode=transport_mode,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence,
+    )
+    return repository.get_stats(filters, confidence_band=confidence_band)
+
+
+@router.get("/stream")
+async def stream_decision_feed(
+    cursor: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events feed of new decisions. Each `decisions` event
+    carries a JSON array of decisions; its id is the cursor to resume
+    from. Browsers reconnect with Last-Event-ID automatically; `cursor`
+    does the same for the first connection (e.g. `meta.next_cursor` of
+    an earlier GET /decisions). Clients that fall too far behind receive
+    a `dropped` event and should reconnect.
+    """
+    if last_event_id is not None and last_event_id.strip().isdigit():
+        cursor = int(last_event_id)
+
+    return StreamingResponse(
+        feed.stream(cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stream/stats")
+def decision_feed_stats():
+    return feed.metrics()
@@ -0,0 +1,130 @@
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.routing.decision_repository import DecisionFilters
+from src.routing.file_repository import FileDecisionRepository
+from src.routing.routing_rules import LABEL_MAPPING_FILE, RULES_FILE, load_table
+from src.routing.sqlite_repository import SqliteDecisionRepository
+
+# =========================
+# Configuration
+# =========================
+
+DEFAULT_RECORDS = 1_000_000
+PAGE_SIZE = 100
+SEED = 42
+
+QUERIES = {
+    "first_page": DecisionFilters(),
+    "country": DecisionFilters(country="Germany"),
+    "region_transport": DecisionFilters(region="APAC", transport_mode="SEA"),
+    "low_confidence": DecisionFilters(max_confidence=0.06),
+}
+
+# =========================
+# Synthetic Decisions
+# =========================
+
+def synthetic_decisions(n: int):
+    """
+    Decisions alternating between the batch and API schemas, routed by
+    the repository's rules over the model's labels, so filters select
+    the same share of records as on real logs.
+    """
+    rng = random.Random(SEED)
+    routes = load_table(RULES_FILE, LABEL_MAPPING_FILE).routes
+
+    for i in range(n):
+        route = rng.choice(routes)
+        record = {
+            "invoice_id": f"inv_{i}",
+            "confidence": round(rng.uniform(0.04, 0.16), 4),
+            "primary_transport": route.primary_transport,
+            "secondary_transport": route.secondary_transport,
+            "routing_code": route.routing_code,
+            "timestamp": f"2026-01-01T00:00:{i % 60:02d}Z",
+        }
+        if i % 2:
+            record.update(supplier_country=route.country, continent=route.region, classifier="model")
+        else:
+            record.update(predicted_country=route.country, region=route.region)
+        yield record
+
+
+def timed(fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+# =========================
+# Benchmark
+# =========================
+
+def benchmark(name, repository, results):
+    ms, _ = timed(lambda: repository.query_decisions(DecisionFilters(), limit=1))
+    results[f"{name}.first_query_ms"] = round(ms, 1)
+
+    for label, filters in QUERIES.items():
+        ms, page = timed(lambda: repository.query_decisions(filters, limit=PAGE_SIZE), repeat=20)
+        results[f"{name}.query.{label}_ms"] = round(ms, 3)
+
+        cursor = page["meta"]["next_cursor"]
+        ms, _ = timed(
+            lambda: repository.query_decisions(filters, limit=PAGE_SIZE, cursor=cursor), repeat=20
+        )
+        results[f"{name}.query.{label}_next_page_ms"] = round(ms, 3)
+
+    # The first call builds the rollups; later calls only catch up
+    ms, _ = timed(lambda: repository.get_stats(DecisionFilters()))
+    results[f"{name}.first_stats_ms"] = round(ms, 1)
+
+    ms, _ = timed(lambda: repository.get_stats(DecisionFilters()), repeat=5)
+    results[f"{name}.stats_ms"] = round(ms, 3)
+
+    ms, _ = timed(lambda: repository.get_stats(DecisionFilters(region="EMEA"), confidence_band="low"), repeat=5)
+    results[f"{name}.stats_filtered_ms"] = round(ms, 3)
+
+    ms, payload = timed(repository.get_all_decisions)
+    results[f"{name}.get_all_ms"] = round(ms, 1)
+    results[f"{name}.count"] = payload["meta"]["count"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the file and SQLite decision repositories."
+    )
+    parser.add_argument("--records", type=int, default=DEFAULT_RECORDS)
+    args = parser.parse_args()
+
+    results = {"records": args.records}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path = Path(tmp) / "decisions.jsonl"
+        db_path = Path(tmp) / "decisions.db"
+
+        ms, _ = timed(lambda: jsonl_path.write_text(
+            "".join(json.dumps(r) + "\n" for r in synthetic_decisions(args.records))
+        ))
+        results["file.write_ms"] = round(ms, 1)
+
+        sqlite_repository = SqliteDecisionRepository(db_path)
+        ms, _ = timed(lambda: sqlite_repository.append_decisions(synthetic_decisions(args.records)))
+        results["sqlite.write_ms"] = round(ms, 1)
+
+        benchmark("file", FileDecisionRepository(jsonl_path), results)
+        benchmark("sqlite", sqlite_repository, results)
+
+        results["file.size_mb"] = round(jsonl_path.stat().st_size / 1e6, 1)
+        results["sqlite.size_mb"] = round(db_path.stat().st_size / 1e6, 1)
+        sqlite_repository.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
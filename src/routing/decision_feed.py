@@ -0,0 +1,219 @@
+import asyncio
+import json
+from typing import AsyncIterator, Optional, Set
+
+from .decision_repository import DecisionRepository, DecisionFilters
+
+# =========================
+# Live Decision Feed
+# =========================
+
+class _Subscriber:
+    def __init__(self, queue_size: int):
+        # One slot beyond the limit is reserved for the drop marker
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size + 1)
+
+
+class DecisionFeed:
+    """
+    Fans newly logged decisions out to Server-Sent Events subscribers.
+
+    One task follows the repository from its end cursor and turns each
+    page of new decisions into a single pre-serialized SSE event, shared
+    by every subscriber. The event id is the cursor after the page, so a
+    reconnecting client (Last-Event-ID) resumes exactly where it stopped.
+
+    The task wakes when `notify()` is called (the API's log writer does
+    this after every commit) and otherwise polls every `poll_interval_ms`,
+    which picks up decisions written by other processes.
+
+    Each subscriber has a bounded queue of `queue_size` events. A client
+    that falls that far behind is dropped rather than buffered: it gets
+    a final event carrying its resume cursor and reconnects from there.
+    """
+
+    def __init__(
+        self,
+        repository: DecisionRepository,
+        poll_interval_ms: float = 500.0,
+        queue_size: int = 256,
+        page_size: int = 500,
+        heartbeat_s: float = 15.0
+    ):
+        self.repository = repository
+        self.poll_interval = poll_interval_ms / 1000.0
+        self.queue_size = queue_size
+        self.page_size = page_size
+        self.heartbeat = heartbeat_s
+
+        self._subscribers: Set[_Subscriber] = set()
+        self._cursor: Optional[int] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self._events = 0
+        self._dropped = 0
+
+    def notify(self):
+        """
+        Signal that decisions were appended. Safe to call from any thread.
+        """
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def stream(self, cursor: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        SSE text for one subscriber: decisions from `cursor` (or only new
+        ones), then live decisions until the subscriber is dropped.
+        """
+        await self._ensure_started()
+
+        # Registering and reading the head happen without an await in
+        # between, so every broadcast from here on starts at `head`
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        head = self._cursor
+
+        try:
+            yield "retry: 2000\n\n"
+
+            if cursor is not None and cursor < head:
+                async for event in self._replay(cursor, head):
+                    yield event
+            else:
+                yield f"id: {head}\n\n"
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if event is None:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def metrics(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "cursor": self._cursor,
+            "events": self._events,
+            "dropped_subscribers": self._dropped,
+        }
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._wakeup = None
+        self._loop = None
+
+    # -------------------------
+    # Internals
+    # -------------------------
+
+    async def _ensure_started(self):
+        # Bound to the running event loop, so created on first use
+        if self._worker is None or self._worker.done():
+            loop = asyncio.get_running_loop()
+            cursor = await loop.run_in_executor(None, self.repository.get_end_cursor)
+
+            # Another subscriber may have started it meanwhile
+            if self._worker is None or self._worker.done():
+                self._loop = loop
+                self._wakeup = asyncio.Event()
+                self._cursor = cursor
+                self._worker = loop.create_task(self._run())
+
+    async def _query(self, cursor: int, end: Optional[int] = None):
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: self.repository.query_decisions(
+                DecisionFilters(), limit=self.page_size, cursor=cursor, end=end
+            )
+        )
+
+    async def _replay(self, cursor: int, end: int) -> AsyncIterator[str]:
+        """
+        Events for the decisions in [cursor, end), read from the repository.
+        """
+        while True:
+            page = await self._query(cursor, end)
+            cursor = page["meta"]["next_cursor"]
+            if page["decisions"]:
+                yield self._event(page["decisions"], cursor)
+            if not page["meta"]["has_more"]:
+                if not page["decisions"]:
+                    yield f"id: {cursor}\n\n"
+                return
+
+    @staticmethod
+    def _event(decisions, cursor: int) -> str:
+        return f"id: {cursor}\nevent: decisions\ndata: {json.dumps(decisions)}\n\n"
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self._follow()
+            except Exception as exc:
+                # Keep the feed alive (e.g. the log is mid-rotation);
+                # the next wakeup retries from the same cursor
+                print(f"Decision feed: {exc!r}")
+
+    async def _follow(self):
+        if not self._subscribers:
+            # Nobody listening: skip ahead, unless someone subscribed
+            # at the current head while we were reading
+            end = await asyncio.get_running_loop().run_in_executor(
+                None, self.repository.get_end_cursor
+            )
+            if not self._subscribers:
+                self._cursor = end
+            return
+
+        has_more = True
+        while has_more:
+            page = await self._query(self._cursor)
+            has_more = page["meta"]["has_more"]
+            if not page["decisions"]:
+                return
+
+            # Advanced together with the broadcast, with no await in
+            # between, so new subscribers never miss a page
+            self._cursor = page["meta"]["next_cursor"]
+            self._broadcast(self._event(page["decisions"], self._cursor))
+
+    def _broadcast(self, event: str):
+        self._events += 1
+
+        for subscriber in list(self._subscribers):
+            if subscriber.queue.qsize() >= self.queue_size:
+                self._drop(subscriber)
+            else:
+                subscriber.queue.put_nowait(event)
+
+    def _drop(self, subscriber: _Subscriber):
+        """
+        Stop sending to a subscriber that cannot keep up. What it has
+        queued is still delivered, then the drop marker, so its last
+        event id is a valid resume point.
+        """
+        self._subscribers.discard(subscriber)
+        self._dropped += 1
+        subscriber.queue.put_nowait(None)
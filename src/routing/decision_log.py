@@ -0,0 +1,325 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .decision_segments import rotate, seal, seal_pending
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on O_APPEND alone
+    fcntl = None
+
+# =========================
+# Configuration
+# =========================
+
+# "write": a commit is one write() into the OS page cache; survives a
+#          process crash, not a power loss.
+# "fsync": each group commit is also fsync'd before callers are released.
+DURABILITY_POLICIES = ("write", "fsync")
+
+# =========================
+# Group-Commit Writer
+# =========================
+
+class DecisionLogWriter:
+    """
+    Append-only JSONL writer with a single long-lived file handle.
+
+    Records from all callers are queued and committed in groups by one
+    background thread: every `flush_interval_ms` (or once `max_batch`
+    records are waiting) the pending lines are written with a single
+    write() call. The file is opened with O_APPEND and each commit holds
+    an exclusive lock, so lines from several processes never interleave.
+
+    `append` returns a Future that resolves once the record is committed
+    under the configured durability policy.
+
+    With `segment_max_bytes` or `segment_max_age_s` set, the file is
+    rotated into the segment directory once it reaches either bound and
+    the rotated segment is compressed in the background (see
+    decision_segments). Segment age is counted from when this writer
+    opened the segment.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        flush_interval_ms: float = 5.0,
+        durability: str = "write",
+        max_batch: int = 1000,
+        segment_max_bytes: Optional[int] = None,
+        segment_max_age_s: Optional[float] = None
+    ):
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(
+                f"Unknown durability policy {durability!r}; expected one of {DURABILITY_POLICIES}"
+            )
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.durability = durability
+        self.max_batch = max_batch
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age_s = segment_max_age_s
+
+        self._fd_lock = threading.Lock()
+        self._sealers: List[threading.Thread] = []
+        self._listeners: List[Callable[[], None]] = []
+        self._open()
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue()
+        self._closed = False
+
+        self._metrics_lock = threading.Lock()
+        self._commits = 0
+        self._records = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self._max_queue_depth = 0
+        self._rotations = 0
+
+        self._thread = threading.Thread(
+            target=self._run, name="decision-log-writer", daemon=True
+        )
+        self._thread.start()
+
+        if segment_max_bytes or segment_max_age_s:
+            # Finish segments a previous writer rotated but did not seal
+            self._start_sealer(seal_pending, self.path)
+
+    def append(self, record: Dict[str, Any]) -> Future:
+        if self._closed:
+            raise RuntimeError("DecisionLogWriter is closed")
+
+        future: Future = Future()
+        self._queue.put((self._encode(record), future))
+
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            with self._metrics_lock:
+                self._max_queue_depth = max(self._max_queue_depth, depth)
+
+        return future
+
+    def append_many(self, records: Iterable[Dict[str, Any]]) -> List[Future]:
+        return [self.append(record) for record in records]
+
+    def add_listener(self, callback: Callable[[], None]):
+        """
+        Call `callback` (on the writer thread) after every commit.
+        """
+        self._listeners.append(callback)
+
+    def close(self):
+        """
+        Commit everything still queued, then release the file handle.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._close()
+        for sealer in self._sealers:
+            sealer.join()
+
+    def rotate_now(self):
+        """
+        Rotate the current file into a segment, regardless of its size.
+        """
+        with self._fd_lock:
+            self._lock_current()
+            self._rotate_locked()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            return {
+                "path": str(self.path),
+                "durability": self.durability,
+                "flush_interval_ms": self.flush_interval * 1000,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "commits": self._commits,
+                "records": self._records,
+                "rotations": self._rotations,
+                "avg_records_per_commit": round(self._records / self._commits, 2) if self._commits else 0.0,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self._commits, 3) if self._commits else 0.0,
+                "max_flush_ms": round(self._max_flush_ms, 3)
+            }
+
+    # -------------------------
+    # Storage (JSONL)
+    # -------------------------
+    # Subclasses targeting other stores override these four hooks.
+
+    def _open(self):
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._segment_opened = time.time()
+
+    def _close(self):
+        os.close(self._fd)
+
+    def _encode(self, record: Dict[str, Any]) -> Any:
+        # Serialize on the caller's thread, off the single writer thread
+        return (json.dumps(record) + "\n").encode("utf-8")
+
+    def _persist(self, items: List[Any]):
+        """
+        Store one group of encoded records. Runs on the writer thread.
+        """
+        self._write_locked(b"".join(items))
+
+    # -------------------------
+    # Internals
+    # -------------------------
+
+    def _collect(self) -> Tuple[List[Tuple[Any, Future]], bool]:
+        """
+        Block for the first record, then gather more until the flush
+        interval elapses or the batch is full. Returns (batch, stop).
+        """
+        first = self._queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Any, Future]]):
+        start = time.perf_counter()
+
+        try:
+            self._persist([item for item, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._metrics_lock:
+            self._commits += 1
+            self._records += len(batch)
+            self._last_flush_ms = elapsed_ms
+            self._total_flush_ms += elapsed_ms
+            self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+
+        for _, future in batch:
+            future.set_result(None)
+
+        # A failing listener must not stop the writer thread
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as exc:
+                print(f"Decision log listener failed: {exc!r}")
+
+    def _write_locked(self, payload: bytes):
+        with self._fd_lock:
+            self._lock_current()
+            rotated = False
+            try:
+                view = memoryview(payload)
+                while view:
+                    written = os.write(self._fd, view)
+                    view = view[written:]
+
+                if self._should_rotate():
+                    if self.durability == "fsync":
+                        os.fsync(self._fd)
+                    self._rotate_locked()
+                    rotated = True
+            finally:
+                if fcntl is not None and not rotated:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+            # Outside the lock: other processes may append while we sync
+            if self.durability == "fsync" and not rotated:
+                os.fsync(self._fd)
+
+    # -------------------------
+    # Segments
+    # -------------------------
+
+    def _lock_current(self):
+        """
+        Lock the file for appending, first switching to the new file if
+        another process rotated the one we hold.
+        """
+        if fcntl is None:
+            return
+
+        while True:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            held = os.fstat(self._fd)
+            try:
+                current = os.stat(self.path)
+            except FileNotFoundError:
+                current = None
+
+            if current is not None and (current.st_dev, current.st_ino) == (held.st_dev, held.st_ino):
+                return
+
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._open()
+
+    def _should_rotate(self) -> bool:
+        if self.segment_max_bytes and os.fstat(self._fd).st_size >= self.segment_max_bytes:
+            return True
+        if self.segment_max_age_s and time.time() - self._segment_opened >= self.segment_max_age_s:
+            return True
+        return False
+
+    def _rotate_locked(self):
+        """
+        Rename the locked file into the segment directory, continue on a
+        fresh file and seal the rotated one in the background.
+        """
+        segment_path = rotate(self.path)
+
+        old_fd = self._fd
+        self._open()
+        if fcntl is not None:
+            fcntl.flock(old_fd, fcntl.LOCK_UN)
+        os.close(old_fd)
+
+        with self._metrics_lock:
+            self._rotations += 1
+
+        self._start_sealer(seal, segment_path)
+
+    def _start_sealer(self, target, path: Path):
+        self._sealers = [t for t in self._sealers if t.is_alive()]
+        sealer = threading.Thread(
+            target=target, args=(path,), name="decision-log-sealer", daemon=True
+        )
+        sealer.start()
+        self._sealers.append(sealer)
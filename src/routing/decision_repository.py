@@ -1,5 +1,32 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+
+class DecisionFilters:
+    """
+    Optional filters for decision queries. None means "any".
+    """
+
+    def __init__(
+        self,
+        country: Optional[str] = None,
+        region: Optional[str] = None,
+        routing_code: Optional[str] = None,
+        transport_mode: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        max_confidence: Optional[float] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ):
+        self.country = country
+        self.region = region
+        self.routing_code = routing_code
+        self.transport_mode = transport_mode
+        self.min_confidence = min_confidence
+        self.max_confidence = max_confidence
+        # ISO-8601 UTC bounds on the decision timestamp, inclusive
+        self.since = since
+        self.until = until
 
 
 class DecisionRepository(ABC):
@@ -8,9 +35,85 @@ class DecisionRepository(ABC):
     Storage implementation must be swappable without affecting API layer.
     """
 
+    # Categorical fields decisions can be filtered on
+    FILTER_FIELDS = ("country", "region", "routing_code", "transport_mode")
+
+    @staticmethod
+    def filter_values(record: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """
+        Filterable fields of a stored decision. The batch writer logs
+        predicted_country/region while the API logs
+        supplier_country/continent; both map to country/region here.
+        """
+        return {
+            "country": record.get("supplier_country") or record.get("predicted_country"),
+            "region": record.get("region") or record.get("continent"),
+            "routing_code": record.get("routing_code"),
+            "transport_mode": record.get("primary_transport"),
+        }
+
     @abstractmethod
     def get_all_decisions(self) -> Dict[str, Any]:
         """
         Returns routing decisions in API-ready schema.
         """
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def get_version(self) -> str:
+        """
+        Cheap token that changes whenever decisions are appended or the
+        store is replaced. Used as the ETag of full listings.
+        """
+        pass
+
+    @abstractmethod
+    def stream_decisions(self) -> Tuple[str, int, Iterator[Dict[str, Any]]]:
+        """
+        Returns (version, count, records) for every decision stored at
+        call time. Records are produced lazily, oldest first, so callers
+        can serialize them in chunks.
+        """
+        pass
+
+    @abstractmethod
+    def get_end_cursor(self) -> int:
+        """
+        Cursor just past the newest decision; a query from it returns
+        only decisions appended later.
+        """
+        pass
+
+    @abstractmethod
+    def query_decisions(
+        self,
+        filters: DecisionFilters,
+        limit: int = 100,
+        cursor: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Returns one page of matching decisions, oldest first, with
+        meta.next_cursor to request the following page. With `end`, only
+        decisions before that cursor are considered.
+        """
+        pass
+
+    @abstractmethod
+    def get_stats(
+        self,
+        filters: DecisionFilters,
+        confidence_band: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Returns dashboard rollups (per country, region, transport and
+        routing code, plus confidence histogram and bands) over the
+        decisions matching the filters.
+        """
+        pass
+
+    def close(self):
+        """
+        Releases any handle held on the store.
+        """
+        pass
@@ -0,0 +1,384 @@
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+# =========================
+# Layout
+# =========================
+#
+# outputs/routing_decisions.jsonl            active segment (appended to)
+# outputs/routing_decisions.segments/
+#     manifest.json                          sealed segments, time ranges
+#     segment-<base offset>.jsonl.gz         sealed (compressed) segment
+#     segment-<base offset>.jsonl            rotated, not yet sealed
+#
+# A segment is named after the byte offset its first line has in the
+# logical, uncompressed log, so byte-offset cursors keep working across
+# rotation and compression.
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+OFFSET_DIGITS = 16
+
+
+def segment_dir_for(log_path: Path) -> Path:
+    log_path = Path(log_path)
+    return log_path.with_name(log_path.stem + ".segments")
+
+
+def segment_name(base_offset: int) -> str:
+    return f"segment-{base_offset:0{OFFSET_DIGITS}d}.jsonl"
+
+
+def base_offset_of(path: Path) -> int:
+    return int(path.name.split("-", 1)[1].split(".", 1)[0])
+
+
+class Segment:
+    """
+    One rotated segment. Time range and record count are known once it
+    is sealed; until then the segment is never skipped.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        base_offset: int,
+        size: int,
+        records: Optional[int] = None,
+        first_timestamp: Optional[str] = None,
+        last_timestamp: Optional[str] = None
+    ):
+        self.path = path
+        self.base_offset = base_offset
+        self.size = size
+        self.records = records
+        self.first_timestamp = first_timestamp
+        self.last_timestamp = last_timestamp
+
+    @property
+    def end_offset(self) -> int:
+        return self.base_offset + self.size
+
+    @property
+    def sealed(self) -> bool:
+        return self.path.suffix == ".gz"
+
+    def overlaps(self, since: Optional[str], until: Optional[str]) -> bool:
+        """
+        Whether the segment may hold decisions in [since, until].
+        Timestamps are ISO-8601 UTC strings, which sort chronologically.
+        """
+        if self.first_timestamp is None or self.last_timestamp is None:
+            return True
+        if since is not None and self.last_timestamp < since:
+            return False
+        if until is not None and self.first_timestamp > until:
+            return False
+        return True
+
+    def open(self):
+        if self.sealed:
+            return gzip.open(self.path, "rb")
+        return open(self.path, "rb")
+
+# =========================
+# Manifest
+# =========================
+
+class _DirLock:
+    """
+    Exclusive lock on the segment directory, across processes. The
+    manifest lock is held only briefly; sealing takes its own lock so a
+    long compression never delays rotation.
+    """
+
+    def __init__(self, segment_dir: Path, name: str = ".manifest.lock"):
+        self.path = Path(segment_dir) / name
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+
+
+def read_manifest(segment_dir: Path) -> Dict[str, Any]:
+    path = Path(segment_dir) / MANIFEST_NAME
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"version": MANIFEST_VERSION, "segments": []}
+
+
+def _write_manifest(segment_dir: Path, manifest: Dict[str, Any]):
+    path = Path(segment_dir) / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def list_segments(log_path: Path) -> List[Segment]:
+    """
+    Rotated segments of a log, oldest first: sealed ones from the
+    manifest, plus rotated ones still waiting to be sealed.
+    """
+    segment_dir = segment_dir_for(log_path)
+    if not segment_dir.is_dir():
+        return []
+
+    segments = {}
+    for entry in read_manifest(segment_dir)["segments"]:
+        segments[entry["base_offset"]] = Segment(
+            segment_dir / entry["file"],
+            entry["base_offset"],
+            entry["bytes"],
+            entry["records"],
+            entry["first_timestamp"],
+            entry["last_timestamp"],
+        )
+
+    for path in segment_dir.glob("segment-*.jsonl"):
+        base_offset = base_offset_of(path)
+        if base_offset in segments:
+            continue  # sealed between the manifest read and the glob
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            continue
+        segments[base_offset] = Segment(path, base_offset, size)
+
+    return [segments[base] for base in sorted(segments)]
+
+
+def active_base_offset(segments: List[Segment]) -> int:
+    return segments[-1].end_offset if segments else 0
+
+# =========================
+# Rotation & Sealing
+# =========================
+
+def rotate(log_path: Path) -> Path:
+    """
+    Move the active segment into the segment directory. The caller must
+    hold the append lock on the active file, so no writer is mid-commit.
+    """
+    log_path = Path(log_path)
+    segment_dir = segment_dir_for(log_path)
+    segment_dir.mkdir(parents=True, exist_ok=True)
+
+    with _DirLock(segment_dir):
+        base_offset = active_base_offset(list_segments(log_path))
+        target = segment_dir / segment_name(base_offset)
+        os.rename(log_path, target)
+
+    return target
+
+
+def seal(path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Compress a rotated segment and record it in the manifest. Returns
+    the manifest entry, or None if another process sealed it first.
+    """
+    path = Path(path)
+    segment_dir = path.parent
+    gz_path = path.with_name(path.name + ".gz")
+    tmp_path = path.with_name(path.name + ".gz.tmp")
+
+    records = 0
+    size = 0
+    first_timestamp = None
+    last_timestamp = None
+
+    # One sealer at a time; a second one finds the segment already gone
+    with _DirLock(segment_dir, ".seal.lock"):
+        try:
+            src = open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+        with src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            for raw in src:
+                dst.write(raw)
+                size += len(raw)
+                if not raw.strip():
+                    continue
+                records += 1
+                try:
+                    timestamp = json.loads(raw).get("timestamp")
+                except json.JSONDecodeError:
+                    continue
+                if timestamp is None:
+                    continue
+                if first_timestamp is None or timestamp < first_timestamp:
+                    first_timestamp = timestamp
+                if last_timestamp is None or timestamp > last_timestamp:
+                    last_timestamp = timestamp
+
+        os.replace(tmp_path, gz_path)
+
+        entry = {
+            "file": gz_path.name,
+            "base_offset": base_offset_of(path),
+            "bytes": size,
+            "compressed_bytes": gz_path.stat().st_size,
+            "records": records,
+            "first_timestamp": first_timestamp,
+            "last_timestamp": last_timestamp,
+        }
+
+        # Publish before unlinking, so readers always find the segment
+        with _DirLock(segment_dir):
+            manifest = read_manifest(segment_dir)
+            manifest["segments"] = [
+                e for e in manifest["segments"] if e["base_offset"] != entry["base_offset"]
+            ] + [entry]
+            manifest["segments"].sort(key=lambda e: e["base_offset"])
+            _write_manifest(segment_dir, manifest)
+
+        os.unlink(path)
+
+    return entry
+
+
+def seal_pending(log_path: Path) -> List[Dict[str, Any]]:
+    """
+    Seal rotated segments left behind, e.g. by a writer that crashed
+    between rotating and sealing.
+    """
+    sealed = []
+    for segment in list_segments(log_path):
+        if not segment.sealed:
+            entry = seal(segment.path)
+            if entry is not None:
+                sealed.append(entry)
+    return sealed
+
+
+# =========================
+# Reading
+# =========================
+
+def iter_lines(
+    log_path: Path,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yield (offset, raw line) for complete lines of the whole log, oldest
+    first: segments in manifest order, then the active file. Sealed
+    segments outside [since, until] are skipped unopened. Offsets are
+    positions in the logical uncompressed log.
+    """
+    log_path = Path(log_path)
+    segments, active = _open_active(log_path)
+
+    try:
+        for segment in segments:
+            if not segment.overlaps(since, until):
+                continue
+            try:
+                f = segment.open()
+            except FileNotFoundError:
+                # Sealed since it was listed: read its .gz instead
+                sealed = [s for s in list_segments(log_path) if s.base_offset == segment.base_offset]
+                if not sealed:
+                    raise
+                f = sealed[0].open()
+            with f:
+                yield from _iter_complete(f, segment.base_offset)
+
+        # Opened together with the listing: if the log has rotated
+        # since, the handle still reads the same file at the same base
+        if active is not None:
+            yield from _iter_complete(active, active_base_offset(segments))
+    finally:
+        if active is not None:
+            active.close()
+
+
+def _open_active(log_path: Path):
+    """
+    (segments, open active file or None) as of one moment: the log did
+    not rotate between listing the segments and opening the file.
+    """
+    for _ in range(5):
+        segments = list_segments(log_path)
+        try:
+            f = open(log_path, "rb")
+        except FileNotFoundError:
+            f = None
+
+        try:
+            current = os.stat(log_path)
+        except FileNotFoundError:
+            current = None
+
+        opened = os.fstat(f.fileno()) if f is not None else None
+        same_file = (opened is None and current is None) or (
+            opened is not None and current is not None
+            and (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino)
+        )
+        if same_file and active_base_offset(list_segments(log_path)) == active_base_offset(segments):
+            return segments, f
+
+        if f is not None:
+            f.close()
+
+    raise RuntimeError(f"{log_path} kept rotating while being opened")
+
+
+def _iter_complete(f, offset: int) -> Iterator[Tuple[int, bytes]]:
+    for raw in f:
+        if not raw.endswith(b"\n"):
+            break
+        yield offset, raw
+        offset += len(raw)
+
+# =========================
+# Maintenance
+# =========================
+
+def main():
+    """
+    Rotate and seal the current log now (e.g. to compress a large log
+    written before segmentation), then print the manifest.
+    """
+    from src.routing.decision_log import DecisionLogWriter
+
+    log_path = Path("outputs/routing_decisions.jsonl")
+
+    if log_path.exists() and log_path.stat().st_size:
+        writer = DecisionLogWriter(log_path)
+        writer.rotate_now()
+        writer.close()
+
+    seal_pending(log_path)
+
+    segment_dir = segment_dir_for(log_path)
+    manifest = read_manifest(segment_dir)
+    print(json.dumps(manifest, indent=2))
+
+    raw = sum(e["bytes"] for e in manifest["segments"])
+    compressed = sum(e["compressed_bytes"] for e in manifest["segments"])
+    if raw:
+        print(f"{len(manifest['segments'])} segments, {raw / 1e6:.1f} MB -> {compressed / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
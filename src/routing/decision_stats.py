@@ -0,0 +1,121 @@
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from .decision_repository import DecisionFilters
+
+# =========================
+# Dashboard Buckets
+# =========================
+
+# Must match frontend/src/dashboards/ConfidenceChart.jsx
+CONFIDENCE_HISTOGRAM = [
+    (0.05, "0.00–0.05"),
+    (0.07, "0.05–0.07"),
+    (0.09, "0.07–0.09"),
+    (0.11, "0.09–0.11"),
+    (0.13, "0.11–0.13"),
+    (0.15, "0.13–0.15"),
+    (None, "0.15+"),
+]
+
+# Must match frontend/src/dashboards/ConfidenceSplitChart.jsx
+CONFIDENCE_BANDS = ("low", "medium", "high")
+
+# Confidences are logged with 4 decimals, so they are counted as integers
+CONFIDENCE_SCALE = 10000
+
+
+def histogram_label(confidence: float) -> str:
+    for upper, label in CONFIDENCE_HISTOGRAM:
+        if upper is None or confidence < upper:
+            return label
+    return CONFIDENCE_HISTOGRAM[-1][1]
+
+
+def confidence_band(confidence: float) -> str:
+    if confidence < 0.08:
+        return "low"
+    if confidence <= 0.1:
+        return "medium"
+    return "high"
+
+
+# =========================
+# Rollups
+# =========================
+
+class DecisionStats:
+    """
+    Dashboard rollups maintained incrementally as decisions are indexed.
+
+    Decisions are counted per (country, region, routing_code, transport)
+    group, and within a group per confidence value. The number of
+    distinct groups and confidence values is bounded by the routing rules
+    and the 4-decimal confidence format, so building a rollup costs the
+    same whether the log holds a thousand decisions or a billion.
+    """
+
+    def __init__(self):
+        self._groups: Dict[Tuple[Optional[str], ...], Counter] = {}
+
+    def add(self, values: Dict[str, Optional[str]], confidence: float):
+        key = (
+            values["country"],
+            values["region"],
+            values["routing_code"],
+            values["transport_mode"],
+        )
+        counts = self._groups.get(key)
+        if counts is None:
+            counts = self._groups[key] = Counter()
+        counts[round(confidence * CONFIDENCE_SCALE)] += 1
+
+    def rollup(self, filters: DecisionFilters, band: Optional[str] = None) -> Dict[str, Any]:
+        by_country: Counter = Counter()
+        by_region: Counter = Counter()
+        by_transport: Counter = Counter()
+        by_routing_code: Counter = Counter()
+        histogram = {label: 0 for _, label in CONFIDENCE_HISTOGRAM}
+        bands = {name: 0 for name in CONFIDENCE_BANDS}
+        total = 0
+
+        wanted = (filters.country, filters.region, filters.routing_code, filters.transport_mode)
+
+        for key, counts in self._groups.items():
+            if any(w is not None and w != k for w, k in zip(wanted, key)):
+                continue
+
+            matched = 0
+            for scaled, n in counts.items():
+                confidence = scaled / CONFIDENCE_SCALE
+                if filters.min_confidence is not None and confidence < filters.min_confidence:
+                    continue
+                if filters.max_confidence is not None and confidence > filters.max_confidence:
+                    continue
+                band_name = confidence_band(confidence)
+                if band is not None and band_name != band:
+                    continue
+
+                histogram[histogram_label(confidence)] += n
+                bands[band_name] += n
+                matched += n
+
+            if not matched:
+                continue
+
+            country, region, routing_code, transport = key
+            by_country[country or "UNKNOWN"] += matched
+            by_region[region or "UNKNOWN"] += matched
+            by_routing_code[routing_code or "UNKNOWN"] += matched
+            by_transport[transport or "UNKNOWN"] += matched
+            total += matched
+
+        return {
+            "count": total,
+            "by_country": dict(by_country.most_common()),
+            "by_region": dict(by_region.most_common()),
+            "by_transport": dict(by_transport.most_common()),
+            "by_routing_code": dict(by_routing_code.most_common()),
+            "confidence_histogram": histogram,
+            "confidence_bands": bands,
+        }
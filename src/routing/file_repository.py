@@ -1,36 +1,414 @@
 import json
+import os
+import threading
+from array import array
+from bisect import bisect_left
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
-from .decision_repository import DecisionRepository
+from .decision_repository import DecisionRepository, DecisionFilters
+from .decision_segments import Segment, active_base_offset, list_segments
+from .decision_stats import DecisionStats
+
+
+class _ValueCodes:
+    """
+    Interns the values of one categorical field as small integer codes.
+    """
+
+    def __init__(self):
+        self.codes: Dict[Optional[str], int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        if value not in self.codes:
+            self.codes[value] = len(self.codes)
+        return self.codes[value]
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self.codes.get(value)
+
+
+class _Partition:
+    """
+    Index of one part of the log: a rotated segment, or the active file
+    (`segment` is None). Positions are record numbers within the part.
+    A rotated segment never changes, so its index is built once, on
+    first use; the active file's grows as lines are appended.
+    """
+
+    def __init__(self, base_offset: int, fields):
+        self.base_offset = base_offset
+        self.indexed_end = base_offset
+        self.segment: Optional[Segment] = None
+        self.records: List[Dict[str, Any]] = []
+        self.offsets = array("q")
+        self.confidence = array("d")
+        self.columns: Dict[str, array] = {f: array("H") for f in fields}
+        self.postings: Dict[str, Dict[int, array]] = {f: {} for f in fields}
+
+    @property
+    def end_offset(self) -> int:
+        return self.segment.end_offset if self.segment is not None else self.indexed_end
+
+    @property
+    def loaded(self) -> bool:
+        return self.segment is None or self.indexed_end >= self.segment.end_offset
 
 
 class FileDecisionRepository(DecisionRepository):
     """
     Reads routing decisions from a JSONL (JSON Lines) file.
     Each line is a single JSON object.
+
+    The log is append-only, so it is tailed rather than re-read. It is
+    indexed per part: one partition per rotated segment (see
+    decision_segments) and one for the active file. The active file is
+    indexed incrementally on every call; a segment is only read (and
+    decompressed) the first time a call needs it, so a query whose
+    `since`/`until` window excludes a sealed segment, going by the
+    manifest's time range, never opens it. Byte offsets are positions in
+    the whole logical log. If the log shrinks or the active file is
+    replaced without a rotation, everything is rebuilt from the start.
+
+    Queries are served from each partition's index: the byte offset of
+    every record, compact per-record filter columns and, per filter
+    value, the ascending list of matching record numbers.
     """
 
+    source = "file"
+
     def __init__(self, decisions_file: Path):
         self.decisions_file = decisions_file
 
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._reset()
+
+    def _reset(self):
+        # Distinguishes a rebuilt index from the old one at the same size
+        self._generation += 1
+        self._file_id = None
+        self._active_base = 0
+        self._end = 0
+        self._partitions: List[_Partition] = []
+        self._codes: Dict[str, _ValueCodes] = {f: _ValueCodes() for f in self.FILTER_FIELDS}
+        self._stats = DecisionStats()
+
     def get_all_decisions(self) -> Dict[str, Any]:
-        decisions: List[Dict[str, Any]] = []
+        with self._lock:
+            self._refresh_index()
+            self._load_all()
+            decisions = [r for p in self._partitions for r in p.records]
 
-        if self.decisions_file.exists():
-            with self.decisions_file.open("r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    decisions.append(json.loads(line))
+        return {
+            "meta": {
+                "source": "file",
+                "generated_at": datetime.utcnow().isoformat() + "Z",
+                "count": len(decisions),
+            },
+            "decisions": decisions,
+        }
+
+    def get_version(self) -> str:
+        with self._lock:
+            self._refresh_index()
+            return f"file-{self._generation}-{self._end}"
+
+    def stream_decisions(self) -> Tuple[str, int, Iterator[Dict[str, Any]]]:
+        with self._lock:
+            self._refresh_index()
+            self._load_all()
+            version = f"file-{self._generation}-{self._end}"
+            # Record lists are only appended to (a reset swaps in new
+            # ones), so the first `count` entries stay valid without the lock
+            parts = [(p.records, len(p.records)) for p in self._partitions]
+
+        count = sum(n for _, n in parts)
+        return version, count, (records[i] for records, n in parts for i in range(n))
+
+    def get_end_cursor(self) -> int:
+        with self._lock:
+            self._refresh_index()
+            return self._end
+
+    def query_decisions(
+        self,
+        filters: DecisionFilters,
+        limit: int = 100,
+        cursor: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_index()
+
+            # One extra match tells whether another page exists
+            matches = self._match(filters, limit + 1, cursor or 0, end)
+            has_more = len(matches) > limit
+            matches = matches[:limit]
+
+            decisions = [partition.records[p] for partition, p in matches]
+
+            # The cursor is the byte offset to resume from; once the end is
+            # reached it points past the last record, so polling with it
+            # returns only decisions appended later.
+            if matches:
+                partition, last = matches[-1]
+                following = last + 1
+                if following < len(partition.offsets):
+                    next_cursor = partition.offsets[following]
+                else:
+                    next_cursor = partition.end_offset
+            else:
+                next_cursor = min(max(cursor or 0, 0), self._end)
+            if end is not None and not has_more:
+                next_cursor = max(end, cursor or 0)
 
         return {
             "meta": {
                 "source": "file",
                 "generated_at": datetime.utcnow().isoformat() + "Z",
                 "count": len(decisions),
+                "cursor": cursor,
+                "next_cursor": next_cursor,
+                "has_more": has_more,
             },
             "decisions": decisions,
-        }
\ No newline at end of file
+        }
+
+    def get_stats(
+        self,
+        filters: DecisionFilters,
+        confidence_band: Optional[str] = None
+    ) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_index()
+            self._load_all()
+            stats = self._stats.rollup(filters, band=confidence_band)
+
+        return {
+            "meta": {
+                "source": "file",
+                "generated_at": datetime.utcnow().isoformat() + "Z",
+                "count": stats.pop("count"),
+            },
+            **stats,
+        }
+
+    # -------------------------
+    # Index
+    # -------------------------
+
+    def _refresh_index(self):
+        """
+        Follow rotations and index lines appended to the active file
+        since the last call. A trailing line without its newline is
+        still being written and is picked up next time.
+        """
+        # A segment can be rotated or sealed while we read; list again
+        for _ in range(5):
+            try:
+                if self._refresh_once():
+                    return
+            except FileNotFoundError:
+                pass
+
+    def _refresh_once(self) -> bool:
+        segments = list_segments(self.decisions_file)
+        base = active_base_offset(segments)
+
+        try:
+            f = self.decisions_file.open("rb")
+        except FileNotFoundError:
+            f = None
+
+        try:
+            # fstat the handle we read from, so a rotation between stat
+            # and open cannot mix two files
+            st = os.fstat(f.fileno()) if f else None
+            file_id = (st.st_dev, st.st_ino) if st else None
+
+            # Rotated after we listed the segments: the handle may be a
+            # newer active file than `base` describes
+            if active_base_offset(list_segments(self.decisions_file)) != base:
+                return False
+
+            end = base + (st.st_size if st else 0)
+            replaced = file_id != self._file_id and base == self._active_base and self._file_id is not None
+            if end < self._end or replaced:
+                self._reset()
+
+            self._file_id = file_id
+            self._active_base = base
+
+            # A former active partition becomes its segment's partition,
+            # keeping what it indexed; the rest is read when needed
+            by_base = {p.base_offset: p for p in self._partitions}
+            partitions = []
+            for segment in segments:
+                partition = by_base.get(segment.base_offset) or _Partition(segment.base_offset, self.FILTER_FIELDS)
+                partition.segment = segment
+                partitions.append(partition)
+
+            active = by_base.get(base)
+            if active is None or active.segment is not None:
+                active = _Partition(base, self.FILTER_FIELDS)
+            partitions.append(active)
+            self._partitions = partitions
+
+            if f is not None and end > active.indexed_end:
+                self._index_from(active, f)
+            self._end = active.indexed_end
+        finally:
+            if f is not None:
+                f.close()
+
+        return True
+
+    def _load(self, partition: _Partition):
+        """
+        Index the rest of a rotated segment.
+        """
+        for _ in range(5):
+            try:
+                with partition.segment.open() as f:
+                    self._index_from(partition, f)
+                return
+            except FileNotFoundError:
+                # Sealed meanwhile: the .jsonl was replaced by its .gz
+                for segment in list_segments(self.decisions_file):
+                    if segment.base_offset == partition.base_offset:
+                        partition.segment = segment
+        raise FileNotFoundError(f"Decision log segment at offset {partition.base_offset} is missing")
+
+    def _load_all(self):
+        for partition in self._partitions:
+            if not partition.loaded:
+                self._load(partition)
+
+    def _index_from(self, partition: _Partition, f):
+        """
+        Index complete lines of the partition's file, starting at the
+        offset reached so far.
+        """
+        offset = partition.indexed_end
+        f.seek(offset - partition.base_offset)
+
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+
+            if raw.strip():
+                self._index_record(partition, offset, json.loads(raw))
+
+            offset += len(raw)
+
+        partition.indexed_end = offset
+
+    def _index_record(self, partition: _Partition, offset: int, record: Dict[str, Any]):
+        position = len(partition.offsets)
+        confidence = float(record.get("confidence") or 0.0)
+        values = self.filter_values(record)
+
+        partition.records.append(record)
+        partition.offsets.append(offset)
+        partition.confidence.append(confidence)
+        self._stats.add(values, confidence)
+
+        for field, value in values.items():
+            code = self._codes[field].code(value)
+            partition.columns[field].append(code)
+            partition.postings[field].setdefault(code, array("I")).append(position)
+
+    def _match(
+        self,
+        filters: DecisionFilters,
+        limit: int,
+        cursor: int,
+        end: Optional[int] = None
+    ) -> List[Tuple[_Partition, int]]:
+        """
+        (partition, record number) of up to `limit` matches at or after
+        byte `cursor` (and before byte `end`). Sealed segments outside
+        the time window are skipped without being read.
+        """
+        windowed = filters.since is not None or filters.until is not None
+        matches: List[Tuple[_Partition, int]] = []
+
+        for partition in self._partitions:
+            if partition.end_offset <= cursor and partition.segment is not None:
+                continue
+            if end is not None and partition.base_offset >= end:
+                break
+            if windowed and partition.segment is not None \
+                    and not partition.segment.overlaps(filters.since, filters.until):
+                continue
+
+            if not partition.loaded:
+                self._load(partition)
+
+            self._match_in(partition, filters, limit, cursor, end, matches)
+            if len(matches) >= limit:
+                break
+
+        return matches
+
+    def _match_in(
+        self,
+        partition: _Partition,
+        filters: DecisionFilters,
+        limit: int,
+        cursor: int,
+        end: Optional[int],
+        matches: List[Tuple[_Partition, int]]
+    ):
+        offsets = partition.offsets
+        start = bisect_left(offsets, cursor)
+        stop = len(offsets) if end is None else bisect_left(offsets, end)
+
+        # Resolve categorical filters to codes; a value this partition
+        # never had matches nothing in it
+        wanted: Dict[str, int] = {}
+        for field in self.FILTER_FIELDS:
+            value = getattr(filters, field)
+            if value is None:
+                continue
+            code = self._codes[field].lookup(value)
+            if code is None or code not in partition.postings[field]:
+                return
+            wanted[field] = code
+
+        # Walk the shortest posting list; check the rest per record
+        if wanted:
+            driver_field = min(wanted, key=lambda f: len(partition.postings[f][wanted[f]]))
+            driver = partition.postings[driver_field][wanted[driver_field]]
+            candidates = (driver[i] for i in range(bisect_left(driver, start), len(driver)))
+        else:
+            candidates = iter(range(start, stop))
+
+        windowed = filters.since is not None or filters.until is not None
+
+        for position in candidates:
+            if position >= stop:
+                break
+            if any(partition.columns[f][position] != code for f, code in wanted.items()):
+                continue
+
+            confidence = partition.confidence[position]
+            if filters.min_confidence is not None and confidence < filters.min_confidence:
+                continue
+            if filters.max_confidence is not None and confidence > filters.max_confidence:
+                continue
+
+            if windowed:
+                timestamp = partition.records[position].get("timestamp")
+                if timestamp is None:
+                    continue
+                if filters.since is not None and timestamp < filters.since:
+                    continue
+                if filters.until is not None and timestamp > filters.until:
+                    continue
+
+            matches.append((partition, position))
+            if len(matches) >= limit:
+                return
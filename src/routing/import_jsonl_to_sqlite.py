@@ -0,0 +1,60 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+from src.routing.decision_segments import iter_lines
+from src.routing.sqlite_repository import SqliteDecisionRepository
+
+# =========================
+# Configuration
+# =========================
+
+DEFAULT_SOURCE = Path("outputs/routing_decisions.jsonl")
+DEFAULT_DB = Path("outputs/routing_decisions.db")
+
+BATCH_SIZE = 10000
+
+# =========================
+# Import
+# =========================
+
+def iter_records(path: Path):
+    """
+    Records of a decision log: its rotated segments in manifest order,
+    then the live file.
+    """
+    for offset, line in iter_lines(path):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            # A torn line from an interrupted writer
+            print(f"Skipping unparseable line at byte {offset} of {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import JSONL routing decisions (batch or API schema) into SQLite. "
+                    "Decisions already in the database are skipped."
+    )
+    parser.add_argument("sources", nargs="*", type=Path, default=[DEFAULT_SOURCE])
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    repository = SqliteDecisionRepository(args.db)
+
+    for source in args.sources:
+        start = time.perf_counter()
+        inserted = repository.append_decisions(iter_records(source), batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"Imported {inserted} new decisions from {source} in {elapsed:.2f}s")
+
+    repository.close()
+    print(f"Decisions database: {args.db}")
+
+
+if __name__ == "__main__":
+    main()
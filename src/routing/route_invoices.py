@@ -1,133 +1,445 @@
+import argparse
 import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-import torch
-import torch.nn.functional as F
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
-from transformers import (
-    DistilBertTokenizerFast,
-    DistilBertForSequenceClassification
-)
+from src.classification.fast_path import FastPathClassifier, config_fingerprint
+from src.classification.inference import PaddingStats, encode, predict_encoded
+from src.classification.quantization import load_classifier, weights_fingerprint
+from src.pipeline.progress import Progress
+from src.routing.decision_log import DecisionLogWriter
+from src.routing.routing_manifest import MANIFEST_FILE, RoutingManifest, content_sha256
+from src.routing.routing_rules import RULES_FILE, RoutingTable, load_table
 
 # =========================
 # Configuration
 # =========================
 
-MODEL_DIR = Path("models/country_classifier")
+# Fully fine-tuned model, or one exported by train_classifier_head
+MODEL_DIR = Path(os.getenv("MODEL_DIR", "models/country_classifier"))
 LABEL_MAPPING_FILE = Path("data/training/label_mapping.json")
 OCR_TEXT_DIR = Path("data/ocr_text_normalized")
 
 OUTPUT_DIR = Path("outputs")
 OUTPUT_FILE = OUTPUT_DIR / "routing_decisions.jsonl"
 
+# Per-shard decision files, merged into OUTPUT_FILE at the end
+SHARD_DIR = OUTPUT_DIR / "routing_shards"
+
 MAX_LENGTH = 512
 
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+# Invoices per forward pass, and per chunk read/tokenized/written at once
+BATCH_SIZE = 16
+CHUNK_SIZE = 512
+
+# Chunks read and tokenized ahead of the model, and threads doing it
+PREFETCH_CHUNKS = 2
+IO_WORKERS = 4
+
+# Same segment bounds as the API's decision log
+SEGMENT_MAX_MB = float(os.getenv("DECISION_LOG_SEGMENT_MB", "64"))
+SEGMENT_MAX_HOURS = float(os.getenv("DECISION_LOG_SEGMENT_HOURS", "24"))
+
+# "fp32" or "int8" (int8 requires an approved quantization gate)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "fp32")
+
+# Skip the model when country signals in the text are decisive (same
+# switch as the API)
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
 
 # =========================
-# Routing Rules (Locked)
+# Versions
 # =========================
 
-REGION_MAP = {
-    "India": "APAC",
-    "China": "APAC",
-    "Vietnam": "APAC",
-    "Thailand": "APAC",
-    "Indonesia": "APAC",
-    "Japan": "APAC",
-    "South Korea": "APAC",
-    "Australia": "APAC",
-
-    "Germany": "EMEA",
-    "France": "EMEA",
-    "United Kingdom": "EMEA",
-    "Italy": "EMEA",
-    "Spain": "EMEA",
-    "Netherlands": "EMEA",
-    "Poland": "EMEA",
-    "Czech Republic": "EMEA",
-    "Saudi Arabia": "EMEA",
-    "United Arab Emirates": "EMEA",
-
-    "United States": "AMER",
-    "Canada": "AMER",
-    "Mexico": "AMER",
-    "Brazil": "AMER"
-}
-
-TRANSPORT_MAP = {
-    "APAC": {
-        "primary": "SEA",
-        "secondary": "AIR"
-    },
-    "EMEA": {
-        "primary": "ROAD_RAIL",
-        "secondary": "SEA"
-    },
-    "AMER": {
-        "primary": "ROAD",
-        "secondary": "RAIL"
-    }
-}
+def model_version() -> str:
+    """
+    Weights and backend, plus the fast-path config, which decides some
+    invoices without the model.
+    """
+    fast_path = config_fingerprint() if FAST_PATH_ENABLED else "off"
+    return f"{weights_fingerprint(MODEL_DIR)[:16]}-{INFERENCE_BACKEND}-fast-path-{fast_path}"
+
+
+def rules_version(routing_table: RoutingTable) -> str:
+    return f"{routing_table.version}-{routing_table.fingerprint}"
+
+
+def open_manifest(routing_table: RoutingTable) -> RoutingManifest:
+    return RoutingManifest(MANIFEST_FILE, model_version(), rules_version(routing_table))
 
 # =========================
-# Inference + Routing
+# Chunk Preparation
 # =========================
 
-def main():
-    # Load label mapping
-    with open(LABEL_MAPPING_FILE, "r", encoding="utf-8") as f:
-        label_to_id = json.load(f)
-
-    id_to_label = {v: k for k, v in label_to_id.items()}
-
-    # Load model and tokenizer
-    tokenizer = DistilBertTokenizerFast.from_pretrained(MODEL_DIR)
-    model = DistilBertForSequenceClassification.from_pretrained(MODEL_DIR)
-    model.eval()
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as out_f:
-        for text_file in OCR_TEXT_DIR.glob("*.txt"):
-            with open(text_file, "r", encoding="utf-8") as f:
-                text = f.read().strip()
-
-            encoding = tokenizer(
-                text,
-                truncation=True,
-                padding="max_length",
-                max_length=MAX_LENGTH,
-                return_tensors="pt"
-            )
-
-            with torch.no_grad():
-                outputs = model(
-                    input_ids=encoding["input_ids"],
-                    attention_mask=encoding["attention_mask"]
-                )
-
-            logits = outputs.logits
-            probs = F.softmax(logits, dim=-1)
-            confidence, pred_id = torch.max(probs, dim=-1)
-
-            predicted_country = id_to_label[pred_id.item()]
-            conf_value = round(confidence.item(), 4)
-
-            region = REGION_MAP.get(predicted_country, "UNKNOWN")
-            transport = TRANSPORT_MAP.get(region, {})
-
-            decision = {
-                "invoice_id": text_file.stem,
-                "predicted_country": predicted_country,
-                "confidence": conf_value,
-                "region": region,
-                "primary_transport": transport.get("primary"),
-                "secondary_transport": transport.get("secondary"),
-                "routing_code": f"{region}-{transport.get('primary')}"
+class Router:
+    """
+    Classifies and routes invoices chunk by chunk. File reads, fast-path
+    checks and tokenization for upcoming chunks run in background
+    threads while the model works on the current one.
+
+    Without a manifest every input is routed (used by the streaming
+    pipeline, which feeds texts rather than files).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = BATCH_SIZE,
+        manifest: Optional[RoutingManifest] = None,
+        force: bool = False
+    ):
+        with open(LABEL_MAPPING_FILE, "r", encoding="utf-8") as f:
+            self.label_to_id = json.load(f)
+
+        # Routing rules compiled against the model's label ids
+        self.routing_table = load_table(RULES_FILE, LABEL_MAPPING_FILE)
+
+        self.manifest = manifest
+        self.force = force
+
+        self.tokenizer, self.model = load_classifier(MODEL_DIR, INFERENCE_BACKEND)
+        self.fast_path = FastPathClassifier() if FAST_PATH_ENABLED else None
+        self.batch_size = batch_size
+
+        # The fast tokenizer's backend must not be entered by two
+        # threads at once; it parallelizes a batch internally anyway
+        self._tokenize_lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+
+        self.padding_stats = PaddingStats()
+        self.fast_path_count = 0
+        self.routed = 0
+        self.unchanged = 0
+
+    def prepare_texts(self, texts: Sequence[str]):
+        """
+        Classify what the fast path can; tokenize the rest for the model.
+        """
+        # Decisive invoices are classified from their country signals
+        # alone; only the rest go through the model.
+        classified = []
+        for text in texts:
+            result = self.fast_path.classify(text) if self.fast_path else None
+            classified.append((self.label_to_id[result[0]], result[1], "fast_path") if result else None)
+        model_indices = [i for i, result in enumerate(classified) if result is None]
+
+        with self._tokenize_lock:
+            encodings = encode([texts[i] for i in model_indices], self.tokenizer, MAX_LENGTH)
+        return classified, model_indices, encodings
+
+    def classify(self, prepared) -> List[Tuple[int, float, str]]:
+        """
+        (label_id, confidence, classifier) per text of a prepared batch.
+        """
+        classified, model_indices, encodings = prepared
+
+        predictions = predict_encoded(
+            encodings,
+            self.tokenizer,
+            self.model,
+            batch_size=self.batch_size,
+            max_length=MAX_LENGTH,
+            stats=self.padding_stats
+        )
+        for i, (pred_id, confidence) in zip(model_indices, predictions):
+            classified[i] = (pred_id, confidence, "model")
+
+        with self._counts_lock:
+            self.fast_path_count += len(classified) - len(model_indices)
+            self.routed += len(classified)
+        return classified
+
+    def decisions(self, invoice_ids: Sequence[str], classified) -> List[dict]:
+        routing_table = self.routing_table
+        routes = routing_table.route_ids([label_id for label_id, _, _ in classified])
+        decided_at = datetime.utcnow().isoformat() + "Z"
+
+        return [
+            {
+                "invoice_id": invoice_id,
+                "predicted_country": route.country,
+                "confidence": round(confidence, 4),
+                "classifier": classifier,
+                "region": route.region,
+                "primary_transport": route.primary_transport,
+                "secondary_transport": route.secondary_transport,
+                "routing_code": route.routing_code,
+                "rules_version": routing_table.version,
+                "timestamp": decided_at
             }
+            for invoice_id, (_, confidence, classifier), route in zip(invoice_ids, classified, routes)
+        ]
+
+    def prepare(self, text_files: Sequence[Path]):
+        """
+        Read one chunk and prepare it for the model. Files whose content
+        already has a current manifest entry are only re-recorded.
+        Runs in a prefetch thread.
+        """
+        texts = []
+        to_route = []
+        entries = []
+        for text_file in text_files:
+            stat = text_file.stat()
+            with open(text_file, "rb") as f:
+                data = f.read()
+
+            if self.manifest is not None:
+                sha256 = content_sha256(data)
+                entries.append(self.manifest.entry(text_file, sha256, stat))
+                if not self.force and self.manifest.is_unchanged(text_file, sha256):
+                    continue
+
+            to_route.append(text_file)
+            texts.append(data.decode("utf-8").strip())
+
+        return to_route, self.prepare_texts(texts), entries
+
+    def decide(self, prepared) -> Tuple[List[dict], List[dict]]:
+        """
+        Decisions for one prepared chunk, plus the manifest entries to
+        record once they are committed.
+        """
+        text_files, prepared_texts, entries = prepared
+
+        classified = self.classify(prepared_texts)
+        if self.manifest is not None:
+            self.unchanged += len(entries) - len(classified)
+
+        decisions = self.decisions([text_file.stem for text_file in text_files], classified)
+        return decisions, entries
+
+    def run(self, text_files: Sequence[Path], chunk_size: int, prefetch: int, io_workers: int):
+        """
+        Yield (decisions, manifest entries) per chunk, in input order.
+        """
+        chunks = [text_files[i:i + chunk_size] for i in range(0, len(text_files), chunk_size)]
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="prefetch") as pool:
+            for chunk in chunks:
+                pending.append(pool.submit(self.prepare, chunk))
+                if len(pending) > prefetch:
+                    yield self.decide(pending.popleft().result())
+            while pending:
+                yield self.decide(pending.popleft().result())
+
+    def summary(self) -> str:
+        lines = [
+            f"Fast path: {self.fast_path_count}/{self.routed} invoices skipped the model",
+            self.padding_stats.summary(),
+        ]
+        if self.manifest is not None:
+            lines.insert(0, f"Unchanged content (not routed again): {self.unchanged}")
+        return "\n".join(lines)
+
+# =========================
+# Decision Log
+# =========================
+
+def open_decision_log() -> DecisionLogWriter:
+    # Appends to the shared decision log; the API writes to it too
+    return DecisionLogWriter(
+        OUTPUT_FILE,
+        segment_max_bytes=int(SEGMENT_MAX_MB * 1_000_000) or None,
+        segment_max_age_s=SEGMENT_MAX_HOURS * 3600 or None
+    )
+
+
+def commit(decision_log: DecisionLogWriter, manifest: RoutingManifest, decisions, entries):
+    """
+    Commit decisions to the log, then record their inputs as done.
+    A crash in between re-routes the chunk on the next run rather than
+    losing it.
+    """
+    for future in decision_log.append_many(decisions):
+        future.result()
+    manifest.record(entries)
+
+# =========================
+# Shards
+# =========================
+
+def shard_path(shard: int) -> Path:
+    return SHARD_DIR / f"shard-{shard:03d}.jsonl"
+
+
+def shard_manifest_path(shard: int) -> Path:
+    return SHARD_DIR / f"shard-{shard:03d}.manifest.jsonl"
+
+
+def read_lines(path: Path) -> List[Dict]:
+    records = []
+    if not path.exists():
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Torn last line from a shard that was killed
+                continue
+    return records
+
+
+def run_shard(shard: int, text_files: List[Path], args, counter):
+    """
+    Route one shard in its own process. Each chunk's decisions go to the
+    shard's own file, then its manifest entries to a second file, so the
+    merge only takes decisions whose chunk completed. `counter` is
+    shared with the parent for progress.
+    """
+    import torch
+
+    # Split the cores between shards instead of oversubscribing them
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // args.shards))
+
+    router = Router(args.batch_size, open_manifest(load_table(RULES_FILE, LABEL_MAPPING_FILE)), args.force)
+    with open(shard_path(shard), "a", encoding="utf-8") as out, \
+            open(shard_manifest_path(shard), "a", encoding="utf-8") as done:
+        for decisions, entries in router.run(text_files, args.chunk_size, args.prefetch, args.io_workers):
+            out.write("".join(json.dumps(d) + "\n" for d in decisions))
+            out.flush()
+            done.write("".join(json.dumps(e) + "\n" for e in entries))
+            done.flush()
+            with counter.get_lock():
+                counter.value += len(entries)
+
+    print(f"Shard {shard}: {router.summary()}")
+
+
+def merge_shards(manifest: RoutingManifest, chunk_size: int) -> int:
+    """
+    Append completed shard work to the decision log and the manifest,
+    then remove the shard files. Also picks up what an interrupted
+    sharded run finished. Returns the number of inputs merged.
+    """
+    paths = sorted(SHARD_DIR.glob("shard-*.manifest.jsonl"))
+    if not paths:
+        return 0
+
+    merged = 0
+    decision_log = open_decision_log()
+    try:
+        for path in paths:
+            decisions_path = path.with_name(path.name.replace(".manifest", ""))
+
+            entries = read_lines(path)
+            done: Set[str] = {Path(entry["file"]).stem for entry in entries}
+            decisions = [d for d in read_lines(decisions_path) if d["invoice_id"] in done]
+
+            for start in range(0, len(decisions), chunk_size):
+                for future in decision_log.append_many(decisions[start:start + chunk_size]):
+                    future.result()
+            manifest.record(entries)
+            merged += len(entries)
+
+            decisions_path.unlink(missing_ok=True)
+            path.unlink()
+    finally:
+        decision_log.close()
+
+    return merged
+
+
+def route_sharded(text_files: List[Path], manifest: RoutingManifest, args):
+    """
+    Route across `args.shards` processes, each taking every Nth file,
+    then merge the shard outputs in shard order.
+    """
+    SHARD_DIR.mkdir(parents=True, exist_ok=True)
+
+    context = multiprocessing.get_context("spawn")
+    counter = context.Value("q", 0)
+    workers = [
+        context.Process(
+            target=run_shard,
+            args=(shard, text_files[shard::args.shards], args, counter),
+            name=f"route-shard-{shard}"
+        )
+        for shard in range(args.shards)
+    ]
+    for worker in workers:
+        worker.start()
+
+    progress = Progress(len(text_files), "Routed invoices")
+    while any(worker.is_alive() for worker in workers):
+        time.sleep(0.5)
+        progress.set(counter.value)
+    for worker in workers:
+        worker.join()
+    progress.set(counter.value)
+    progress.report(force=True)
+
+    # Completed chunks of failed shards are kept; a rerun routes the rest
+    merge_shards(manifest, args.chunk_size)
+
+    failed = [worker.name for worker in workers if worker.exitcode != 0]
+    if failed:
+        raise SystemExit(f"Shards failed: {failed}; rerun to resume")
+
+
+def route(text_files: List[Path], manifest: RoutingManifest, args):
+    router = Router(args.batch_size, manifest, force=args.force)
+    progress = Progress(len(text_files), "Routed invoices")
+
+    decision_log = open_decision_log()
+    try:
+        for decisions, entries in router.run(text_files, args.chunk_size, args.prefetch, args.io_workers):
+            commit(decision_log, manifest, decisions, entries)
+            progress.update(len(entries))
+    finally:
+        decision_log.close()
+
+    progress.report(force=True)
+    print(router.summary())
+
+# =========================
+# Main
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify and route OCR'd invoices in batches.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="invoices per forward pass")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="invoices read and written at once")
+    parser.add_argument("--prefetch", type=int, default=PREFETCH_CHUNKS, help="chunks prepared ahead of the model")
+    parser.add_argument("--io-workers", type=int, default=IO_WORKERS, help="threads reading and tokenizing")
+    parser.add_argument("--shards", type=int, default=1, help="worker processes, merged at the end")
+    parser.add_argument("--force", action="store_true", help="route every input again, ignoring the manifest")
+    args = parser.parse_args()
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    manifest = open_manifest(load_table(RULES_FILE, LABEL_MAPPING_FILE))
+
+    # Work finished by an interrupted sharded run
+    resumed = merge_shards(manifest, args.chunk_size)
+    if resumed:
+        print(f"Merged {resumed} inputs left by an interrupted sharded run")
+
+    text_files = sorted(OCR_TEXT_DIR.glob("*.txt"))
+    pending = text_files if args.force else manifest.pending(text_files)
+    print(
+        f"{len(pending)}/{len(text_files)} inputs to route "
+        f"(model {manifest.model_version}, rules {manifest.rules_version})"
+    )
+
+    if args.shards > 1:
+        route_sharded(pending, manifest, args)
+    else:
+        route(pending, manifest, args)
 
-            out_f.write(json.dumps(decision) + "\n")
+    # One line per input again, now that no run is appending
+    manifest.compact()
 
     print(f"Routing decisions written to {OUTPUT_FILE}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
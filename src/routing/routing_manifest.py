@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# =========================
+# Configuration
+# =========================
+
+MANIFEST_FILE = Path("outputs/routing_manifest.jsonl")
+
+# =========================
+# Manifest
+# =========================
+
+def content_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class RoutingManifest:
+    """
+    Which inputs `route_invoices` has already routed, and with what.
+
+    One JSON line per routed input file: its name, size, mtime, content
+    hash, and the model and routing-rules versions that produced its
+    decision. Lines are appended only after the decisions they cover are
+    committed to the decision log, so an interrupted run resumes from
+    its last completed chunk. The last line for a file wins.
+
+    An input is current when its size and mtime match its entry (no
+    read needed) and the model and rules versions are unchanged; a file
+    whose stat changed but whose hash did not is not routed again.
+    """
+
+    def __init__(self, path: Path, model_version: str, rules_version: str):
+        self.path = Path(path)
+        self.model_version = model_version
+        self.rules_version = rules_version
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        entries = {}
+        if not self.path.exists():
+            return entries
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from an interrupted append
+                    continue
+                entries[entry["file"]] = entry
+        return entries
+
+    def _versions_match(self, entry: Dict[str, Any]) -> bool:
+        return entry["model"] == self.model_version and entry["rules"] == self.rules_version
+
+    def is_current(self, path: Path, stat: Optional[os.stat_result] = None) -> bool:
+        entry = self.entries.get(path.name)
+        if entry is None or not self._versions_match(entry):
+            return False
+        stat = stat or path.stat()
+        return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def is_unchanged(self, path: Path, sha256: str) -> bool:
+        entry = self.entries.get(path.name)
+        return entry is not None and self._versions_match(entry) and entry["sha256"] == sha256
+
+    def pending(self, paths: Iterable[Path]) -> List[Path]:
+        return [path for path in paths if not self.is_current(path)]
+
+    def entry(self, path: Path, sha256: str, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
+        stat = stat or path.stat()
+        return {
+            "file": path.name,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "model": self.model_version,
+            "rules": self.rules_version,
+        }
+
+    def record(self, entries: List[Dict[str, Any]]):
+        """
+        Append entries and fsync, once their decisions are committed.
+        """
+        if not entries:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        for entry in entries:
+            self.entries[entry["file"]] = entry
+
+    def compact(self):
+        """
+        Rewrite the manifest with one line per file.
+        """
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+# =========================
+# Configuration
+# =========================
+
+RULES_FILE = Path("config/routing_rules.json")
+LABEL_MAPPING_FILE = Path("data/training/label_mapping.json")
+
+UNKNOWN_REGION = "UNKNOWN"
+
+# =========================
+# Compiled Table
+# =========================
+
+class Route(NamedTuple):
+    country: str
+    region: str
+    primary_transport: Optional[str]
+    secondary_transport: Optional[str]
+    routing_code: str
+
+
+def _route(country: str, regions: Dict[str, str], transport: Dict[str, Dict[str, str]]) -> Route:
+    region = regions.get(country, UNKNOWN_REGION)
+    modes = transport.get(region, {})
+    primary = modes.get("primary")
+    return Route(country, region, primary, modes.get("secondary"), f"{region}-{primary}")
+
+
+class RoutingTable:
+    """
+    Routing rules compiled against the model's labels: one Route per
+    label id, in a list indexed by that id. Routing a batch is a single
+    index per decision, straight from the model's argmax ids.
+    Immutable once built; reloading builds a new table.
+    """
+
+    def __init__(self, rules: Dict[str, Any], label_to_id: Dict[str, int], fingerprint: str):
+        regions = rules["regions"]
+        transport = rules["transport"]
+
+        missing = sorted({r for r in regions.values() if r not in transport})
+        if missing:
+            raise ValueError(f"Routing rules: no transport for region(s) {missing}")
+        for region, modes in transport.items():
+            if not modes.get("primary"):
+                raise ValueError(f"Routing rules: region {region!r} has no primary transport")
+
+        ids = sorted(label_to_id.values())
+        if ids != list(range(len(ids))):
+            raise ValueError("Label ids must be dense, starting at 0")
+
+        self.version = rules["version"]
+        self.fingerprint = fingerprint
+        self.regions = dict(regions)
+        self.transport = {r: dict(m) for r, m in transport.items()}
+
+        self.routes: List[Route] = [None] * len(ids)
+        for country, label_id in label_to_id.items():
+            self.routes[label_id] = _route(country, regions, transport)
+
+        self._by_country = {route.country: route for route in self.routes}
+        self.unrouted = sorted(c for c in label_to_id if c not in regions)
+
+    def route_ids(self, label_ids: Sequence[int]) -> List[Route]:
+        """
+        Routes for a batch of label ids (list, numpy array or tensor).
+        """
+        if hasattr(label_ids, "tolist"):
+            label_ids = label_ids.tolist()
+        routes = self.routes
+        return [routes[i] for i in label_ids]
+
+    def route_id(self, label_id: int) -> Route:
+        return self.routes[label_id]
+
+    def route_country(self, country: str) -> Route:
+        route = self._by_country.get(country)
+        if route is None:
+            route = _route(country, self.regions, self.transport)
+        return route
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "labels": len(self.routes),
+            "unrouted_labels": self.unrouted,
+        }
+
+# =========================
+# Loading & Hot Reload
+# =========================
+
+def load_table(rules_file: Path = RULES_FILE, label_mapping_file: Path = LABEL_MAPPING_FILE) -> RoutingTable:
+    with open(rules_file, "rb") as f:
+        raw = f.read()
+    with open(label_mapping_file, "r", encoding="utf-8") as f:
+        label_to_id = json.load(f)
+
+    fingerprint = hashlib.sha256(raw).hexdigest()[:16]
+    return RoutingTable(json.loads(raw), label_to_id, fingerprint)
+
+
+class RoutingRules:
+    """
+    The current RoutingTable, reloaded when the rules file changes.
+
+    A reload parses and validates the whole file into a new table before
+    swapping it in with a single assignment, so callers always see either
+    the old rules or the new ones, never a mix. A file that fails to
+    load leaves the current table in place.
+
+    `table()` checks the file's mtime/size at most every
+    `check_interval_s`, so edits are picked up without a restart.
+    """
+
+    def __init__(
+        self,
+        rules_file: Path = RULES_FILE,
+        label_mapping_file: Path = LABEL_MAPPING_FILE,
+        check_interval_s: float = 5.0
+    ):
+        self.rules_file = Path(rules_file)
+        self.label_mapping_file = Path(label_mapping_file)
+        self.check_interval = check_interval_s
+
+        self._lock = threading.Lock()
+        self._stat = self._file_stat()
+        self._table = load_table(self.rules_file, self.label_mapping_file)
+        self._checked_at = time.monotonic()
+        self._reloads = 0
+        self._last_error: Optional[str] = None
+
+    def table(self) -> RoutingTable:
+        if self.check_interval and time.monotonic() - self._checked_at >= self.check_interval:
+            self.maybe_reload()
+        return self._table
+
+    def maybe_reload(self) -> bool:
+        """
+        Reload if the rules file changed since the last load.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            stat = self._file_stat()
+            if stat == self._stat:
+                return False
+            return self._reload(stat)
+
+    def reload(self) -> bool:
+        with self._lock:
+            return self._reload(self._file_stat())
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            **self._table.as_dict(),
+            "rules_file": str(self.rules_file),
+            "reloads": self._reloads,
+            "last_error": self._last_error,
+        }
+
+    def _reload(self, stat) -> bool:
+        try:
+            table = load_table(self.rules_file, self.label_mapping_file)
+        except (OSError, ValueError, KeyError) as exc:
+            # Keep serving the last good rules; retry once the file changes
+            self._stat = stat
+            self._last_error = f"{type(exc).__name__}: {exc}"
+            return False
+
+        self._stat = stat
+        self._table = table
+        self._reloads += 1
+        self._last_error = None
+        return True
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.rules_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
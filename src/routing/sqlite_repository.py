@@ -0,0 +1,338 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from .decision_log import DecisionLogWriter
+from .decision_repository import DecisionRepository, DecisionFilters
+from .decision_stats import DecisionStats
+
+# =========================
+# Schema
+# =========================
+
+# Rows fetched per lock acquisition when streaming every decision
+STREAM_BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    invoice_id TEXT,
+    country TEXT,
+    region TEXT,
+    routing_code TEXT,
+    transport_mode TEXT,
+    confidence REAL,
+    classifier TEXT,
+    timestamp TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_decisions_invoice_id ON decisions (invoice_id);
+CREATE INDEX IF NOT EXISTS idx_decisions_country ON decisions (country);
+CREATE INDEX IF NOT EXISTS idx_decisions_region ON decisions (region);
+CREATE INDEX IF NOT EXISTS idx_decisions_routing_code ON decisions (routing_code);
+CREATE INDEX IF NOT EXISTS idx_decisions_confidence ON decisions (confidence);
+CREATE INDEX IF NOT EXISTS idx_decisions_timestamp ON decisions (timestamp);
+"""
+
+# A decision is identified by its invoice and timestamp, so importing a
+# log twice (or one the API already wrote here) adds nothing
+UNIQUE_INDEX = "idx_decisions_invoice_timestamp"
+
+UNIQUE_SQL = f"""
+DELETE FROM decisions
+WHERE invoice_id IS NOT NULL AND timestamp IS NOT NULL AND id NOT IN (
+    SELECT MIN(id) FROM decisions GROUP BY invoice_id, timestamp
+);
+CREATE UNIQUE INDEX {UNIQUE_INDEX} ON decisions (invoice_id, timestamp);
+"""
+
+INSERT_SQL = """
+INSERT OR IGNORE INTO decisions (
+    invoice_id, country, region, routing_code, transport_mode,
+    confidence, classifier, timestamp, record
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def connect(db_path: Path, synchronous: str = "NORMAL") -> sqlite3.Connection:
+    """
+    Open the decisions database in WAL mode, creating the schema if needed.
+    WAL lets readers run while a writer commits.
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    conn.executescript(SCHEMA)
+
+    # Databases created before the unique index may hold duplicates;
+    # drop them (keeping the first copy) once, when adding the index
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (UNIQUE_INDEX,)
+    ).fetchone()
+    if not exists:
+        with conn:
+            conn.executescript(UNIQUE_SQL)
+    return conn
+
+
+def decision_row(record: Dict[str, Any]) -> Tuple:
+    """
+    Row for one decision. The stored record always carries the
+    predicted_country/region names the dashboard reads, whichever writer
+    (batch or API) produced it.
+    """
+    values = DecisionRepository.filter_values(record)
+
+    record = dict(record)
+    record.setdefault("predicted_country", values["country"])
+    record.setdefault("region", values["region"])
+
+    return (
+        record.get("invoice_id"),
+        values["country"],
+        values["region"],
+        values["routing_code"],
+        values["transport_mode"],
+        float(record.get("confidence") or 0.0),
+        record.get("classifier"),
+        record.get("timestamp"),
+        json.dumps(record),
+    )
+
+# =========================
+# Repository
+# =========================
+
+class SqliteDecisionRepository(DecisionRepository):
+    """
+    Reads routing decisions from an embedded SQLite database.
+
+    Filter fields, confidence and timestamp are stored as indexed columns
+    next to the original record. Pages are keyed by row id, which only
+    grows, so `next_cursor` keeps working while decisions are appended.
+    Rollups are kept in memory and updated from rows added since the last
+    call, as in the file repository.
+    """
+
+    source = "sqlite"
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+
+        self._lock = threading.Lock()
+        self._conn = connect(self.db_path)
+        self._stats = DecisionStats()
+        self._stats_id = 0
+
+    def append_decisions(self, records: Iterable[Dict[str, Any]], batch_size: int = 10000) -> int:
+        """
+        Insert decisions in batches of one transaction each, skipping
+        any already stored. Returns the number inserted.
+        """
+        inserted = 0
+        batch: List[Tuple] = []
+
+        with self._lock:
+            for record in records:
+                batch.append(decision_row(record))
+                if len(batch) >= batch_size:
+                    with self._conn:
+                        inserted += self._conn.executemany(INSERT_SQL, batch).rowcount
+                    batch = []
+
+            if batch:
+                with self._conn:
+                    inserted += self._conn.executemany(INSERT_SQL, batch).rowcount
+
+        return inserted
+
+    def get_all_decisions(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT record FROM decisions ORDER BY id").fetchall()
+
+        decisions = [json.loads(record) for (record,) in rows]
+
+        return {
+            "meta": {
+                "source": "sqlite",
+                "generated_at": datetime.utcnow().isoformat() + "Z",
+                "count": len(decisions),
+            },
+            "decisions": decisions,
+        }
+
+    def get_version(self) -> str:
+        with self._lock:
+            return f"sqlite-{self._last_id()}"
+
+    def stream_decisions(self) -> Tuple[str, int, Iterator[Dict[str, Any]]]:
+        with self._lock:
+            last_id = self._last_id()
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM decisions WHERE id <= ?", (last_id,)
+            ).fetchone()
+
+        return f"sqlite-{last_id}", count, self._iter_records(last_id)
+
+    def _iter_records(self, last_id: int) -> Iterator[Dict[str, Any]]:
+        """
+        Records up to `last_id`, fetched in id ranges so the lock is only
+        held per batch and memory stays bounded.
+        """
+        after = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, record FROM decisions WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                    (after, last_id, STREAM_BATCH_SIZE)
+                ).fetchall()
+            if not rows:
+                return
+            for _, record in rows:
+                yield json.loads(record)
+            after = rows[-1][0]
+
+    def _last_id(self) -> int:
+        (last_id,) = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM decisions").fetchone()
+        return last_id
+
+    def get_end_cursor(self) -> int:
+        with self._lock:
+            return self._last_id() + 1
+
+    def query_decisions(
+        self,
+        filters: DecisionFilters,
+        limit: int = 100,
+        cursor: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> Dict[str, Any]:
+        with self._lock:
+            # Pin the end of the table, so rows committed mid-query are
+            # left for the next page instead of being skipped
+            last_id = self._last_id()
+            if end is not None:
+                last_id = min(last_id, end - 1)
+
+            clauses = ["id >= ?", "id <= ?"]
+            params: List[Any] = [cursor or 0, last_id]
+
+            for field in self.FILTER_FIELDS:
+                value = getattr(filters, field)
+                if value is not None:
+                    clauses.append(f"{field} = ?")
+                    params.append(value)
+            if filters.min_confidence is not None:
+                clauses.append("confidence >= ?")
+                params.append(filters.min_confidence)
+            if filters.max_confidence is not None:
+                clauses.append("confidence <= ?")
+                params.append(filters.max_confidence)
+            if filters.since is not None:
+                clauses.append("timestamp >= ?")
+                params.append(filters.since)
+            if filters.until is not None:
+                clauses.append("timestamp <= ?")
+                params.append(filters.until)
+
+            # One extra row tells whether another page exists
+            params.append(limit + 1)
+            rows = self._conn.execute(
+                f"SELECT id, record FROM decisions WHERE {' AND '.join(clauses)} "
+                f"ORDER BY id LIMIT ?",
+                params
+            ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # Past the end, the cursor points after the newest row, so polling
+        # with it returns only decisions appended later
+        if has_more:
+            next_cursor = rows[-1][0] + 1
+        else:
+            next_cursor = max(last_id + 1, cursor or 0)
+
+        return {
+            "meta": {
+                "source": "sqlite",
+                "generated_at": datetime.utcnow().isoformat() + "Z",
+                "count": len(rows),
+                "cursor": cursor,
+                "next_cursor": next_cursor,
+                "has_more": has_more,
+            },
+            "decisions": [json.loads(record) for _, record in rows],
+        }
+
+    def get_stats(
+        self,
+        filters: DecisionFilters,
+        confidence_band: Optional[str] = None
+    ) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_stats()
+            stats = self._stats.rollup(filters, band=confidence_band)
+
+        return {
+            "meta": {
+                "source": "sqlite",
+                "generated_at": datetime.utcnow().isoformat() + "Z",
+                "count": stats.pop("count"),
+            },
+            **stats,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _refresh_stats(self):
+        rows = self._conn.execute(
+            "SELECT id, country, region, routing_code, transport_mode, confidence "
+            "FROM decisions WHERE id > ? ORDER BY id",
+            (self._stats_id,)
+        )
+        for row_id, country, region, routing_code, transport_mode, confidence in rows:
+            self._stats.add(
+                {
+                    "country": country,
+                    "region": region,
+                    "routing_code": routing_code,
+                    "transport_mode": transport_mode,
+                },
+                confidence,
+            )
+            self._stats_id = row_id
+
+# =========================
+# Group-Commit Writer
+# =========================
+
+class SqliteDecisionWriter(DecisionLogWriter):
+    """
+    Group-commit writer that inserts each batch of decisions into the
+    SQLite store in one transaction. Under the "fsync" policy SQLite
+    syncs every commit (synchronous=FULL); under "write" it syncs only
+    at WAL checkpoints (synchronous=NORMAL).
+    """
+
+    def _open(self):
+        synchronous = "FULL" if self.durability == "fsync" else "NORMAL"
+        self._conn = connect(self.path, synchronous=synchronous)
+
+    def _close(self):
+        self._conn.close()
+
+    def _encode(self, record: Dict[str, Any]) -> Any:
+        return decision_row(record)
+
+    def _persist(self, items: List[Any]):
+        with self._conn:
+            self._conn.executemany(INSERT_SQL, items)